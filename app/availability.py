@@ -0,0 +1,149 @@
+# app/availability.py
+
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+
+class RoomIntervals:
+    """
+    Sorted interval list for the bookings of a single room.
+
+    Intervals are kept ordered by start date. Alongside them we keep a running
+    maximum of the end dates, so an overlap query only needs one bisect on the
+    starts and one lookup in the running maximum.
+    """
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        self.max_ends = []
+        for booking_id, start, end in sorted(intervals, key=lambda i: i[1]):
+            self.starts.append(start)
+            self.ends.append(end)
+            self.ids.append(booking_id)
+        self._rebuild_max_ends(0)
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rebuild_max_ends(self, position):
+        del self.max_ends[position:]
+        current = self.max_ends[-1] if self.max_ends else None
+        for end in self.ends[position:]:
+            current = end if current is None or end > current else current
+            self.max_ends.append(current)
+
+    def add(self, booking_id, start, end):
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, booking_id)
+        self._rebuild_max_ends(position)
+
+    def remove(self, booking_id):
+        if booking_id not in self.ids:
+            return
+        position = self.ids.index(booking_id)
+        del self.starts[position]
+        del self.ends[position]
+        del self.ids[position]
+        self._rebuild_max_ends(position)
+
+    def overlaps(self, start, end, inclusive=True):
+        """
+        Check if any interval overlaps the range [start, end].
+        :param inclusive: Treat touching boundaries as an overlap.
+        """
+        if inclusive:
+            position = bisect_right(self.starts, end)
+            return position > 0 and self.max_ends[position - 1] >= start
+        position = bisect_left(self.starts, end)
+        return position > 0 and self.max_ends[position - 1] > start
+
+
+class AvailabilityIndex:
+    """
+    In-process availability index with one RoomIntervals per room.
+
+    Rooms are loaded on first use straight from the booking table (no ORM
+    objects) and then kept in sync from the session events registered in
+    app/models.py. Pending changes are only applied once the transaction
+    commits, and are dropped on rollback. Entries older than `ttl` seconds are
+    reloaded so writes made by other worker processes are picked up.
+    """
+
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self._rooms = {}
+        self._owners = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('AVAILABILITY_INDEX_TTL', self.ttl)
+        app.extensions['availability_index'] = self
+
+    def clear(self):
+        with self._lock:
+            self._rooms.clear()
+            self._owners.clear()
+
+    def invalidate(self, room_id):
+        with self._lock:
+            self._rooms.pop(room_id, None)
+
+    @staticmethod
+    def room_bookings_query(room_id):
+        """
+        Live bookings of one room, as loaded into the index. Checked by
+        app/query_plans.py.
+        """
+        from app.extensions import db
+        from app.models import Booking, BookingStatus
+
+        return db.session.query(Booking.id, Booking.start_date, Booking.end_date).filter(
+            Booking.room_id == room_id,
+            Booking.status != BookingStatus.CANCELLED
+        )
+
+    def _load(self, room_id):
+        rows = self.room_bookings_query(room_id).all()
+        return RoomIntervals(
+            (booking_id, start, end) for booking_id, start, end in rows
+            if start is not None and end is not None
+        )
+
+    def _get(self, room_id):
+        with self._lock:
+            intervals = self._rooms.get(room_id)
+        if intervals is not None and time.monotonic() - intervals.loaded_at < self.ttl:
+            return intervals
+        intervals = self._load(room_id)
+        with self._lock:
+            self._rooms[room_id] = intervals
+            for booking_id in intervals.ids:
+                self._owners[booking_id] = room_id
+        return intervals
+
+    def overlaps(self, room_id, start, end, inclusive=True):
+        intervals = self._get(room_id)
+        with self._lock:
+            return intervals.overlaps(start, end, inclusive=inclusive)
+
+    def apply(self, changes):
+        """
+        Apply committed booking changes.
+        :param changes: Iterable of (booking_id, room_id, start, end) tuples.
+            A start of None means the booking no longer holds the room.
+        """
+        with self._lock:
+            for booking_id, room_id, start, end in changes:
+                previous_room_id = self._owners.pop(booking_id, None)
+                if previous_room_id in self._rooms:
+                    self._rooms[previous_room_id].remove(booking_id)
+                intervals = self._rooms.get(room_id)
+                if intervals is not None and start is not None and end is not None:
+                    intervals.add(booking_id, start, end)
+                    self._owners[booking_id] = room_id
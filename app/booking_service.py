@@ -0,0 +1,165 @@
+# app/booking_service.py
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app.bulk import release_bookings
+from app.extensions import db, availability_index, rate_calendar
+from app.models import Room, Booking, BookingStatus
+
+
+# Default for BOOKING_HOLD_MINUTES
+DEFAULT_HOLD_MINUTES = 15
+
+
+class BookingConflictError(ValueError):
+    """Raised when a room is already booked for the requested dates."""
+
+
+class HoldExpiredError(ValueError):
+    """Raised when confirming a pending booking whose hold has lapsed."""
+
+
+def begin_write():
+    """
+    On SQLite, take the database write lock for the current transaction up
+    front with BEGIN IMMEDIATE, so what it reads cannot change before it
+    writes. Other databases lock rows with SELECT ... FOR UPDATE instead.
+    :return: True if the lock was taken here or already held.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name != 'sqlite':
+        return False
+    # Only possible before the driver has opened a transaction itself. If
+    # it already has, this transaction has written and holds the lock.
+    if not connection.connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+    return True
+
+
+def lock_room(room_id):
+    """
+    Serialize booking writes for a room inside the current transaction.
+    SQLite has no row locks, so this takes the database write lock (see
+    begin_write). Other databases lock the room row.
+    """
+    if begin_write():
+        return Room.query.get(room_id)
+    return Room.query.filter(Room.id == room_id).with_for_update().one_or_none()
+
+
+def hold_duration():
+    """
+    How long a new PENDING booking holds its room, from BOOKING_HOLD_MINUTES.
+    Zero or None means holds never lapse.
+    """
+    minutes = current_app.config.get('BOOKING_HOLD_MINUTES', DEFAULT_HOLD_MINUTES)
+    return timedelta(minutes=minutes) if minutes else None
+
+
+def release_lapsed_holds(room_id, start_date, end_date, now):
+    """
+    Cancel the lapsed holds on a room that overlap a stay, ahead of the sweeper.
+    :return: Number of holds released.
+    """
+    return release_bookings(Booking.query.filter(
+        Booking.room_id == room_id,
+        Booking.status == BookingStatus.PENDING,
+        Booking.expires_at <= now,
+        Booking.start_date < end_date,
+        Booking.end_date > start_date
+    ), cancel=True)
+
+
+def create_booking(user_id, room_id, start_date, end_date):
+    """
+    Book a room in one short transaction with exactly one commit.
+    Inserting the booking claims its nights in room_night, and the primary key
+    on (room_id, night) makes the database reject any overlap with a live booking.
+    The new booking is a PENDING hold that lapses after hold_duration() unless
+    confirmed. If the clash is with lapsed holds the sweeper has not cancelled
+    yet, they are released and the booking is retried once.
+    :return: The committed booking.
+    :raises BookingConflictError: If the room is already booked for the dates.
+    :raises ValueError: If the room does not exist or the dates are invalid.
+    """
+    if start_date >= end_date:
+        raise ValueError('Start date must be before end date')
+
+    duration = hold_duration()
+    for attempt in range(2):
+        try:
+            room = lock_room(room_id)
+            if room is None:
+                raise ValueError('Room not found.')
+
+            now = datetime.utcnow()
+            if attempt and not release_lapsed_holds(room_id, start_date, end_date, now):
+                raise BookingConflictError('Room is already booked during the specified dates.')
+            booking = Booking(user_id=user_id, room_id=room_id, start_date=start_date, end_date=end_date,
+                              expires_at=now + duration if duration else None)
+            booking.calculate_total_price(room)
+            db.session.add(booking)
+            db.session.flush()
+            db.session.commit()
+            return booking
+        except IntegrityError:
+            db.session.rollback()
+        except Exception:
+            db.session.rollback()
+            raise
+    raise BookingConflictError('Room is already booked during the specified dates.')
+
+
+def confirm_booking(booking_id, user_id=None):
+    """
+    Confirm a PENDING booking, ending its hold, in one short transaction.
+    :param user_id: If given, the booking must belong to this user.
+    :return: The confirmed booking.
+    :raises HoldExpiredError: If the hold lapsed before confirmation.
+    :raises ValueError: If there is no such pending booking.
+    """
+    try:
+        if begin_write():
+            booking = Booking.query.get(booking_id)
+        else:
+            booking = Booking.query.filter(Booking.id == booking_id).with_for_update().one_or_none()
+        if booking is None or (user_id is not None and booking.user_id != user_id):
+            raise ValueError('Booking not found.')
+        if booking.is_expired():
+            raise HoldExpiredError('This hold has expired; please book the room again.')
+        if booking.status != BookingStatus.PENDING:
+            raise ValueError(f'Only pending bookings can be confirmed; this one is {booking.status.value.lower()}.')
+        booking.status = BookingStatus.CONFIRMED
+        booking.expires_at = None
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return booking
+
+
+def quote(room, start_date, end_date):
+    """
+    Price a stay without booking it. Prices come from the rate calendar and
+    availability from the in-process availability index; back-to-back stays
+    do not conflict, as with room_night.
+    :return: Dict with the nights, nightly rates, discount, total price and availability.
+    :raises ValueError: If the dates are invalid.
+    """
+    if start_date >= end_date:
+        raise ValueError('Start date must be before end date')
+    price = rate_calendar.price_stay(room, start_date, end_date)
+    return {
+        'room_id': room.id,
+        'start_date': start_date.date().isoformat(),
+        'end_date': end_date.date().isoformat(),
+        'nights': len(price['nightly_rates']),
+        'nightly_rate': room.price,
+        'nightly_rates': price['nightly_rates'],
+        'discount_percent': price['discount_percent'],
+        'total_price': price['total_price'],
+        'available': not availability_index.overlaps(room.id, start_date, end_date, inclusive=False),
+    }
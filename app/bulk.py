@@ -0,0 +1,286 @@
+# app/bulk.py
+
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import chain
+
+import click
+from flask.cli import with_appcontext
+
+from app.extensions import db, catalog_cache, user_cache
+from app.jobs import job
+from app.models import (User, Room, RoomType, Amenity, Booking, BookingStatus, RoomNight, room_amenities,
+                        rollup_entry, queue_rollup)
+
+# Rows or users handled per transaction
+BULK_BATCH_SIZE = 500
+
+# Formats accepted by import_rooms
+IMPORT_FORMATS = ('csv', 'json')
+
+# Row errors kept in an ImportResult; later ones are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportResult:
+    """
+    Outcome of a room import.
+    :param created: Rooms inserted.
+    :param skipped: Rows whose room number already exists.
+    :param errors: (row number, message) for the first invalid rows.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def read_records(stream, fmt):
+    """
+    Stream records from an upload without reading it all into memory.
+    CSV needs a header row; amenities are separated by ';'. JSON is either one
+    object per line or a single array of objects.
+    :param stream: Binary file-like object.
+    :return: Iterator of (row number, dict).
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for number, record in enumerate(csv.DictReader(text), start=2):
+            yield number, record
+        return
+    first = text.readline()
+    if first.lstrip().startswith('['):
+        # A JSON array has to be parsed whole
+        for number, record in enumerate(json.loads(first + text.read()), start=1):
+            yield number, record
+        return
+    for number, line in enumerate(chain([first], text), start=1):
+        if line.strip():
+            yield number, json.loads(line)
+
+
+def _room_row(record):
+    """
+    Validate one record into a Room mapping plus its amenity names.
+    :raises ValueError: With a message for the import report.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('Expected an object.')
+    room_number = str(record.get('room_number') or '').strip()
+    if not room_number or len(room_number) > 50:
+        raise ValueError('room_number is required (at most 50 characters).')
+    room_type = str(record.get('type') or '').strip().upper()
+    if room_type not in RoomType.__members__:
+        raise ValueError(f'type must be one of {", ".join(RoomType.__members__)}.')
+    try:
+        price = float(record.get('price'))
+    except (TypeError, ValueError):
+        raise ValueError('price must be a number.')
+    if price < 0:
+        raise ValueError('price must not be negative.')
+    description = (record.get('description') or '').strip() or None
+    if description and len(description) > 255:
+        raise ValueError('description is longer than 255 characters.')
+    amenities = record.get('amenities') or []
+    if isinstance(amenities, str):
+        amenities = amenities.split(';')
+    names = sorted({str(name).strip() for name in amenities if str(name).strip()})
+    if any(len(name) > 50 for name in names):
+        raise ValueError('Amenity names are at most 50 characters.')
+    return {'room_number': room_number, 'type': RoomType[room_type], 'price': price,
+            'description': description}, names
+
+
+def _amenity_ids(names, known):
+    """
+    Resolve amenity names to ids, creating the missing amenities.
+    :param known: Dict of name -> id, updated in place.
+    :raises ValueError: If the new amenities would not fit in the amenity
+        mask; nothing is inserted then.
+    """
+    missing = sorted(set(names) - set(known))
+    if missing:
+        # New rows take ids after the current largest one
+        last_id = db.session.query(db.func.max(Amenity.id)).scalar() or 0
+        if last_id + len(missing) > Amenity.MAX_ID:
+            raise ValueError(f'No room for new amenities ({", ".join(missing)}); '
+                             f'at most {Amenity.MAX_ID} amenities are supported.')
+        db.session.execute(Amenity.__table__.insert(), [{'name': name} for name in missing])
+        known.update(db.session.query(Amenity.name, Amenity.id).filter(Amenity.name.in_(missing)))
+    return [known[name] for name in names]
+
+
+def _import_batch(batch, known_amenities, result):
+    rows, links = [], []
+    for row_number, row, names in batch:
+        try:
+            amenity_ids = _amenity_ids(names, known_amenities)
+            row['amenity_mask'] = Amenity.mask_for(amenity_ids)
+        except ValueError as e:
+            result.error(row_number, str(e))
+            continue
+        rows.append(row)
+        links.append(amenity_ids)
+    # return_defaults fills in the new ids so the amenity links can be written
+    db.session.bulk_insert_mappings(Room, rows, return_defaults=True)
+    link_rows = [
+        {'room_id': row['id'], 'amenity_id': amenity_id}
+        for row, amenity_ids in zip(rows, links) for amenity_id in amenity_ids
+    ]
+    if link_rows:
+        db.session.execute(room_amenities.insert(), link_rows)
+    db.session.commit()
+    result.created += len(rows)
+
+
+def import_rooms(stream, fmt, batch_size=BULK_BATCH_SIZE, progress=None):
+    """
+    Import rooms from a CSV or JSON upload in batches, each in its own
+    transaction. Columns: room_number, type, price, description, amenities.
+    Unknown amenities are created; rows whose room number already exists are
+    skipped, so an import can be re-run after fixing errors.
+    :param progress: Optional callable(result) invoked after every batch.
+    :return: ImportResult.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f'Unsupported import format: {fmt}')
+    result = ImportResult()
+    existing = {number for number, in db.session.query(Room.room_number)}
+    known_amenities = dict(db.session.query(Amenity.name, Amenity.id))
+    batch = []
+    try:
+        for row_number, record in read_records(stream, fmt):
+            try:
+                row, names = _room_row(record)
+            except ValueError as e:
+                result.error(row_number, str(e))
+                continue
+            if row['room_number'] in existing:
+                result.skipped += 1
+                continue
+            existing.add(row['room_number'])
+            batch.append((row_number, row, names))
+            if len(batch) >= batch_size:
+                _import_batch(batch, known_amenities, result)
+                batch = []
+                if progress:
+                    progress(result)
+        if batch:
+            _import_batch(batch, known_amenities, result)
+            if progress:
+                progress(result)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        result.error(None, f'Could not read the file: {e}')
+    finally:
+        if result.created:
+            catalog_cache.bump()
+    return result
+
+
+def release_bookings(query, cancel):
+    """
+    Delete or cancel the bookings matched by a query with set-based
+    statements, keeping room_night in step and queuing the daily rollup
+    changes the same way the per-booking listeners in app/models.py do. The
+    availability index and room catalog are updated when the session commits.
+    :return: Number of bookings released.
+    """
+    rows = query.with_entities(
+        Booking.id, Booking.room_id, Booking.start_date, Booking.end_date, Booking.status, Booking.total_price
+    ).all()
+    if not rows:
+        return 0
+    entries = []
+    for booking_id, room_id, start_date, end_date, status, total_price in rows:
+        entries.append(rollup_entry(room_id, start_date, end_date, status, total_price, -1))
+        if cancel:
+            entries.append(rollup_entry(room_id, start_date, end_date, BookingStatus.CANCELLED, total_price, 1))
+
+    booking_ids = [row[0] for row in rows]
+    connection = db.session.connection()
+    for ids in _chunks(booking_ids, BULK_BATCH_SIZE):
+        connection.execute(RoomNight.__table__.delete().where(RoomNight.booking_id.in_(ids)))
+        if cancel:
+            connection.execute(Booking.__table__.update().where(Booking.id.in_(ids))
+                               .values(status=BookingStatus.CANCELLED))
+        else:
+            connection.execute(Booking.__table__.delete().where(Booking.id.in_(ids)))
+    queue_rollup(connection, entries)
+    db.session.info.setdefault('availability_changes', []).extend(
+        (booking_id, room_id, None, None) for booking_id, room_id, *_ in rows)
+    db.session.info['catalog_changed'] = True
+    return len(rows)
+
+
+def remove_users(user_ids, archive=False, batch_size=BULK_BATCH_SIZE, progress=None):
+    """
+    Delete or archive users in batches, each in its own transaction.
+    Deleting removes the users together with all their bookings. Archiving
+    deactivates the users and cancels their bookings that have not started
+    yet, keeping their history.
+    :param progress: Optional callable(done, total) invoked after every batch.
+    :return: Number of users deleted or archived.
+    """
+    user_ids = sorted({int(user_id) for user_id in user_ids})
+    done = 0
+    now = datetime.utcnow()
+    for ids in _chunks(user_ids, batch_size):
+        try:
+            bookings = Booking.query.filter(Booking.user_id.in_(ids))
+            if archive:
+                bookings = bookings.filter(Booking.start_date >= now, Booking.status != BookingStatus.CANCELLED)
+            release_bookings(bookings, cancel=archive)
+            users = User.__table__
+            if archive:
+                count = db.session.execute(users.update().where(users.c.id.in_(ids)).values(is_active=False)).rowcount
+            else:
+                count = db.session.execute(users.delete().where(users.c.id.in_(ids))).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        user_cache.invalidate(*ids)
+        done += count
+        if progress:
+            progress(done, len(user_ids))
+    return done
+
+
+@job('remove_users')
+def remove_users_job(user_ids, archive=False):
+    """
+    Bulk delete or archive queued from the admin user list. Safe to re-run:
+    users already removed are skipped.
+    """
+    remove_users(user_ids, archive=archive)
+
+
+@click.command('import-rooms')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), help='Defaults to the file extension.')
+@click.option('--batch-size', default=BULK_BATCH_SIZE, show_default=True)
+@with_appcontext
+def import_rooms_command(path, fmt, batch_size):
+    """Import rooms from a CSV or JSON file."""
+    fmt = fmt or path.rsplit('.', 1)[-1].lower()
+    with open(path, 'rb') as stream:
+        result = import_rooms(stream, fmt, batch_size,
+                              progress=lambda result: click.echo(f'{result.created} rooms imported...'))
+    click.echo(f'Created {result.created}, skipped {result.skipped} existing, {result.failed} invalid.')
+    for row_number, message in result.errors:
+        click.echo(f'  row {row_number}: {message}', err=True)
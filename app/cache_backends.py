@@ -0,0 +1,44 @@
+# app/cache_backends.py
+
+import threading
+import time
+
+
+class LocalBackend:
+    """
+    In-process stand-in for a shared cache backend such as Redis or memcached.
+
+    Implements the small interface the caches rely on: get(key),
+    set(key, value, ttl), delete(key) and incr(key). Values are stored as-is,
+    so it is only shared between threads of one process; swap in a real
+    backend with the same methods to share across workers.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl if ttl else None, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            expires_at, value = self._data.get(key, (None, 0))
+            self._data[key] = (expires_at, int(value) + 1)
+            return int(value) + 1
@@ -0,0 +1,125 @@
+# app/catalog_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+# Backend key holding the shared catalog version
+VERSION_KEY = 'catalog:version'
+
+
+class CatalogCache:
+    """
+    Cache for rendered room-catalog fragments and query results.
+
+    Every key is prefixed with the room-catalog version, which is bumped
+    whenever rooms, amenities, photos or bookings change. Bumping never has to
+    find and delete stale entries: they simply stop being asked for and fall
+    out of the bounded LRU.
+
+    Without a backend the version is per process, so changes committed by
+    other processes (other workers, `flask run-jobs`, CLI commands) only show
+    once local entries expire after `ttl` seconds. With a shared backend (see
+    app/cache_backends.py for the interface) the version lives in the backend
+    so a bump in one worker is seen by all, and entries missing locally are
+    looked up there before being rebuilt.
+
+    Config keys: CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL and CATALOG_CACHE_BACKEND.
+    """
+
+    def __init__(self, maxsize=512, ttl=300, backend=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bumps = 0
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('CATALOG_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('CATALOG_CACHE_TTL', self.ttl)
+        self.backend = app.config.get('CATALOG_CACHE_BACKEND', self.backend)
+        self.clear()
+        app.extensions['catalog_cache'] = self
+
+    @property
+    def version(self):
+        if self.backend is not None:
+            return int(self.backend.get(VERSION_KEY) or 0)
+        return self._version
+
+    def bump(self):
+        """
+        Invalidate every cached catalog entry by moving to a new version.
+        """
+        with self._lock:
+            self._version += 1
+            self.bumps += 1
+        if self.backend is not None:
+            if hasattr(self.backend, 'incr'):
+                self.backend.incr(VERSION_KEY)
+            else:
+                self.backend.set(VERSION_KEY, self.version + 1)
+
+    @staticmethod
+    def make_key(name, args=None):
+        """
+        Build a key from a name and request arguments (order independent).
+        """
+        if not args:
+            return name
+        parts = sorted((key, value) for key in args for value in args.getlist(key)) \
+            if hasattr(args, 'getlist') else sorted(args.items())
+        return name + '?' + '&'.join(f'{key}={value}' for key, value in parts)
+
+    def get_or_set(self, key, producer):
+        """
+        Return the cached value for a key, calling `producer()` on a miss.
+        """
+        key = f'catalog:{self.version}:{key}'
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        value = self.backend.get(key) if self.backend is not None else None
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            value = producer()
+            if self.backend is not None:
+                self.backend.set(key, value, self.ttl)
+        else:
+            with self._lock:
+                self.hits += 1
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl if self.ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        version = self.version
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': version,
+                'entries': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'bumps': self.bumps,
+            }
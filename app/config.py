@@ -0,0 +1,63 @@
+# app/config.py
+
+import os
+
+from sqlalchemy.pool import QueuePool
+
+# site.db at the project root
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'site.db'))
+
+
+class ProductionConfig:
+    """
+    Production profile: create_app('app.config.ProductionConfig').
+
+    SQLite runs in WAL mode so readers never block behind the writer, with a
+    busy timeout instead of immediate "database is locked" errors. Each
+    worker keeps a pool of connections. Read-only views (see
+    app.database.reads_from_replica) use the replica bind, which defaults to
+    a query_only pool on the same file; point DATABASE_REPLICA_URL at a real
+    replica to move those reads off the primary.
+
+    The catalog cache is per process unless CATALOG_CACHE_BACKEND points at a
+    shared backend (see app/cache_backends.py). Without one, a change
+    committed by another process reaches a worker only when its entries
+    expire, so the TTL is kept short here. Set the backend when running
+    several workers or `flask run-jobs` for changes to show everywhere at once.
+    The same goes for the user cache and USER_CACHE_BACKEND: a user
+    deactivated in one process stays logged in on other workers until their
+    snapshot expires.
+    """
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+    SQLALCHEMY_BINDS = {'replica': os.environ.get('DATABASE_REPLICA_URL', SQLALCHEMY_DATABASE_URI)}
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # SQLAlchemy 1.4 gives file-based SQLite a NullPool; keep connections
+    # open instead. Pooled connections move between threads, one at a time.
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'poolclass': QueuePool,
+        'pool_size': int(os.environ.get('DATABASE_POOL_SIZE', 8)),
+        'max_overflow': int(os.environ.get('DATABASE_MAX_OVERFLOW', 8)),
+        'pool_timeout': 10,
+        'connect_args': {'check_same_thread': False, 'timeout': 5},
+    }
+
+    # Seconds a worker may serve catalog pages that another process has since
+    # changed, when no shared backend is configured
+    CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 30))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        # WAL makes NORMAL safe against corruption; only the last commits
+        # before a power loss can be lost
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -65536,  # KiB, i.e. 64 MiB per connection
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    }
+
+    # Compiled templates shared by the workers of a host; defaults to a
+    # private directory under the system temp dir (see app/warmup.py)
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
@@ -0,0 +1,95 @@
+# app/database.py
+
+import threading
+import weakref
+from functools import partial, wraps
+
+from flask import g, has_request_context
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm
+
+# Bind key of the optional read-only database (see SQLALCHEMY_BINDS)
+REPLICA_BIND = 'replica'
+
+
+def reads_from_replica(f):
+    """
+    Mark a view as read-only so its queries go to the replica bind, when one
+    is configured. Anything the request flushes still goes to the primary.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g._use_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _replica_requested():
+    return has_request_context() and g.get('_use_replica', False) and not g.get('_wrote_primary', False)
+
+
+def _apply_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+
+class RoutingSession(SignallingSession):
+    """
+    Session that sends reads from views marked with reads_from_replica to the
+    replica bind. Flushes always use the primary, and once a request has
+    flushed it stays on the primary so it reads its own writes.
+    """
+
+    def __init__(self, db, *args, **kwargs):
+        self.db = db
+        super().__init__(db, *args, **kwargs)
+        event.listen(self, 'after_flush', self._remember_write)
+
+    @staticmethod
+    def _remember_write(session, flush_context):
+        if has_request_context():
+            g._wrote_primary = True
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or not _replica_requested() or REPLICA_BIND not in (self.app.config['SQLALCHEMY_BINDS'] or {}):
+            return super().get_bind(mapper, clause)
+        if mapper is not None and mapper.persist_selectable.info.get('bind_key') is not None:
+            return super().get_bind(mapper, clause)
+        return self.db.get_engine(self.app, bind=REPLICA_BIND)
+
+
+class Database(SQLAlchemy):
+    """
+    Flask-SQLAlchemy with read-replica routing and SQLite connection tuning.
+
+    Every new SQLite connection runs the pragmas from SQLITE_PRAGMAS (WAL,
+    synchronous, cache_size, mmap_size, busy_timeout...); connections of the
+    replica bind are additionally made query_only.
+
+    Config keys: SQLITE_PRAGMAS, plus SQLALCHEMY_BINDS['replica'] for the
+    optional read-only database.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tuned_engines = weakref.WeakSet()
+        self._tuning_lock = threading.Lock()
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def get_engine(self, app=None, bind=None):
+        engine = super().get_engine(app, bind)
+        if engine.dialect.name != 'sqlite':
+            return engine
+        with self._tuning_lock:
+            if engine not in self._tuned_engines:
+                pragmas = dict(self.get_app(app).config.get('SQLITE_PRAGMAS') or {})
+                if bind == REPLICA_BIND:
+                    pragmas['query_only'] = 'ON'
+                if pragmas:
+                    event.listen(engine, 'connect', partial(_apply_pragmas, pragmas))
+                self._tuned_engines.add(engine)
+        return engine
@@ -0,0 +1,102 @@
+# app/exports.py
+
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+
+from app.extensions import db
+from app.models import User, Booking
+
+# Rows fetched from the database cursor per batch
+EXPORT_BATCH_SIZE = 1000
+
+# Columns exported for each entity. Password hashes are never exported.
+BOOKING_COLUMNS = (Booking.id, Booking.user_id, Booking.room_id, Booking.start_date,
+                   Booking.end_date, Booking.total_price, Booking.status)
+USER_COLUMNS = (User.id, User.username, User.email, User.first_name, User.last_name,
+                User.date_registered, User.is_admin, User.is_active)
+
+
+def booking_export_query(start_date=None, end_date=None, statuses=None):
+    """
+    Bookings overlapping [start_date, end_date), optionally limited to some statuses.
+    """
+    query = db.session.query(*BOOKING_COLUMNS)
+    if start_date:
+        query = query.filter(Booking.end_date > start_date)
+    if end_date:
+        query = query.filter(Booking.start_date < end_date)
+    if statuses:
+        query = query.filter(Booking.status.in_(statuses))
+    return query.order_by(Booking.id)
+
+
+def user_export_query(start_date=None, end_date=None):
+    """
+    Users registered in [start_date, end_date).
+    """
+    query = db.session.query(*USER_COLUMNS)
+    if start_date:
+        query = query.filter(User.date_registered >= start_date)
+    if end_date:
+        query = query.filter(User.date_registered < end_date)
+    return query.order_by(User.id)
+
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _batches(query, batch_size):
+    """
+    Iterate over a column query in lists of rows, reading from a server-side
+    cursor so only one batch is ever held in memory.
+    """
+    batch = []
+    for row in query.yield_per(batch_size):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_csv(query, columns, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Generate CSV text for a column query, one chunk per batch.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in columns])
+    yield buffer.getvalue()
+    for batch in _batches(query, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_plain(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+
+
+def stream_ndjson(query, columns, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Generate newline-delimited JSON for a column query, one chunk per batch.
+    """
+    keys = [column.key for column in columns]
+    for batch in _batches(query, batch_size):
+        yield ''.join(
+            json.dumps(dict(zip(keys, (_plain(value) for value in row)))) + '\n'
+            for row in batch
+        )
+
+
+# Supported export formats: generator and response mimetype
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
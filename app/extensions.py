@@ -1,13 +1,22 @@
 # extensions.py
 # app/extensions.py
 
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
-from flask_bcrypt import Bcrypt
+from app.availability import AvailabilityIndex
+from app.rates import RateCalendar
+from app.holds import HoldSweeper
+from app.jobs import JobRunner
+from app.database import Database
+from app.passwords import PasswordHasher
+from app.user_cache import UserCache
+from app.photos import PhotoProcessor
+from app.catalog_cache import CatalogCache
+from app.profiling import RequestProfiler, LazyLoadGuard
 
-# Initialize the extension for database operations
-db = SQLAlchemy()
+# Initialize the extension for database operations, with SQLite tuning and
+# read-replica routing (see app/database.py)
+db = Database()
 
 # Initialize the extension for database migrations
 migrate = Migrate()
@@ -18,5 +27,32 @@ login_manager = LoginManager()
 # Specify the view to redirect to when a user needs to log in
 login_manager.login_view = 'login'
 
-# Initialize the extension for password hashing
-bcrypt = Bcrypt()
+# Initialize the pooled password hashing service
+password_hasher = PasswordHasher()
+
+# Initialize the cache behind the Flask-Login user loader
+user_cache = UserCache()
+
+# Initialize the room photo upload and resizing pipeline
+photo_processor = PhotoProcessor()
+
+# Initialize the versioned cache for room listings and search results
+catalog_cache = CatalogCache()
+
+# Initialize the in-process room availability index
+availability_index = AvailabilityIndex()
+
+# Initialize the nightly rate calendar used to price stays
+rate_calendar = RateCalendar()
+
+# Initialize the background sweeper for lapsed booking holds
+hold_sweeper = HoldSweeper()
+
+# Initialize the worker pool for the durable background job queue
+job_runner = JobRunner()
+
+# Initialize the opt-in per-request profiler
+request_profiler = RequestProfiler()
+
+# Initialize the test-mode guard against lazy loads during template render
+lazy_load_guard = LazyLoadGuard()
@@ -0,0 +1,164 @@
+# app/holds.py
+
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+
+import click
+from flask.cli import with_appcontext
+
+# Lapsed holds cancelled per transaction
+SWEEP_BATCH_SIZE = 500
+
+
+def lapsed_holds_query(now, batch_size=SWEEP_BATCH_SIZE):
+    """
+    Ids of the oldest PENDING bookings whose hold lapsed by `now`, served by
+    ix_booking_hold_expiry. Checked by app/query_plans.py.
+    """
+    from app.extensions import db
+    from app.models import Booking, BookingStatus
+
+    return db.session.query(Booking.id).filter(
+        Booking.status == BookingStatus.PENDING,
+        Booking.expires_at <= now
+    ).order_by(Booking.expires_at).limit(batch_size)
+
+
+def expire_holds(now=None, batch_size=SWEEP_BATCH_SIZE):
+    """
+    Cancel PENDING bookings whose hold has lapsed, oldest first, in batches
+    that each commit on their own. Cancelling frees their room_night rows and
+    moves them to CANCELLED in the daily rollups.
+    :return: Number of holds cancelled.
+    """
+    from app.extensions import db
+    from app.booking_service import begin_write
+    from app.bulk import release_bookings
+    from app.models import Booking
+
+    now = now or datetime.utcnow()
+    expired = 0
+    while True:
+        try:
+            # Lock first so a hold confirmed meanwhile is not cancelled
+            locked = begin_write()
+            lapsed = lapsed_holds_query(now, batch_size)
+            if not locked:
+                lapsed = lapsed.with_for_update(skip_locked=True)
+            ids = [booking_id for booking_id, in lapsed]
+            if ids:
+                release_bookings(Booking.query.filter(Booking.id.in_(ids)), cancel=True)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        expired += len(ids)
+        if len(ids) < batch_size:
+            return expired
+
+
+class HoldSweeper:
+    """
+    Background thread that cancels lapsed booking holds every `interval`
+    seconds, so abandoned PENDING bookings stop holding inventory. It is not
+    started by create_app, so CLI commands and web workers do not each run
+    one: `flask run-jobs` and run.py start it. Sweeps are idempotent, so
+    several running at once is harmless. Web workers sweep from the views
+    that show availability instead, at most once per `interval` each, see
+    sweep_if_due. Set HOLD_SWEEP_INTERVAL to 0 to disable both and run
+    `flask expire-holds` from cron instead.
+
+    Config keys: HOLD_SWEEP_INTERVAL and HOLD_SWEEP_BATCH_SIZE.
+    """
+
+    def __init__(self, interval=60, batch_size=SWEEP_BATCH_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.app = None
+        self.expired = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._sweep_lock = threading.Lock()
+        self._last_sweep = None
+
+    def init_app(self, app):
+        self.interval = app.config.get('HOLD_SWEEP_INTERVAL', self.interval)
+        self.batch_size = app.config.get('HOLD_SWEEP_BATCH_SIZE', self.batch_size)
+        self.app = app
+        app.extensions['hold_sweeper'] = self
+
+    def start(self):
+        if not self.interval or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='hold-sweeper', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def sweep(self):
+        with self.app.app_context():
+            expired = expire_holds(batch_size=self.batch_size)
+        self.expired += expired
+        return expired
+
+    def sweep_if_due(self):
+        """
+        Sweep in the current app context unless this process swept less than
+        `interval` seconds ago, another request is sweeping or the background
+        thread runs here. Failures are logged, not raised, so the view still
+        renders.
+        :return: Number of holds cancelled.
+        """
+        if not self.interval or (self._thread is not None and self._thread.is_alive()):
+            return 0
+        if self._last_sweep is not None and time.monotonic() - self._last_sweep < self.interval:
+            return 0
+        if not self._sweep_lock.acquire(blocking=False):
+            return 0
+        try:
+            self._last_sweep = time.monotonic()
+            expired = expire_holds(batch_size=self.batch_size)
+        except Exception:
+            self.app.logger.exception('Hold sweep failed')
+            return 0
+        finally:
+            self._sweep_lock.release()
+        self.expired += expired
+        return expired
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                self.app.logger.exception('Hold sweep failed')
+
+
+def releases_lapsed_holds(f):
+    """
+    Mark a view that shows availability, so lapsed holds are released before
+    it reads even when no sweeper thread runs. Put it above
+    reads_from_replica, so the sweep writes to the primary.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        from app.extensions import hold_sweeper
+
+        hold_sweeper.sweep_if_due()
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@click.command('expire-holds')
+@click.option('--batch-size', default=SWEEP_BATCH_SIZE, show_default=True)
+@with_appcontext
+def expire_holds_command(batch_size):
+    """Cancel pending bookings whose hold has lapsed."""
+    click.echo(f'Expired {expire_holds(batch_size=batch_size)} holds.')
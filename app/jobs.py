@@ -0,0 +1,323 @@
+# app/jobs.py
+
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+
+# Registered job handlers by name, see `job`
+JOB_HANDLERS = {}
+
+# Defaults for the JOB_* config keys
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF = 2.0
+DEFAULT_BACKOFF_MAX = 600.0
+
+
+def job(name):
+    """
+    Register a function as the handler for jobs called `name`. It receives
+    the job payload as keyword arguments. Handlers may run more than once for
+    the same job (a crash after their own commits, a retry), so they must be
+    idempotent. Writes they leave uncommitted are committed together with the
+    job being marked done.
+    """
+    def decorator(f):
+        JOB_HANDLERS[name] = f
+        return f
+    return decorator
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=None, connection=None):
+    """
+    Add a job in the current transaction (the outbox): it becomes visible to
+    the runner only if the transaction commits, and is dropped with it on
+    rollback.
+    :param connection: Connection to insert with, e.g. from a mapper event
+        during flush; defaults to the session's.
+    """
+    from flask import current_app
+    from app.extensions import db
+    from app.models import Job
+
+    now = datetime.utcnow()
+    (connection or db.session.connection()).execute(Job.__table__.insert().values(
+        name=name,
+        payload=json.dumps(payload or {}),
+        max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS),
+        run_at=now + timedelta(seconds=delay),
+        created_at=now,
+    ))
+    db.session.info['jobs_enqueued'] = True
+
+
+def backoff(attempts, base=DEFAULT_BACKOFF, cap=DEFAULT_BACKOFF_MAX):
+    """
+    Seconds to wait before retrying after `attempts` failures: exponential,
+    capped, with jitter so failed jobs do not retry in lockstep.
+    """
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+class JobRunner:
+    """
+    Worker pool for the durable job queue kept in the `job` table.
+
+    Each worker thread finds the oldest due job with a plain read, claims it
+    with a conditional UPDATE (the only point a poll takes the write lock),
+    runs its handler and marks it done in the same transaction as the
+    handler's own writes. A failed job is retried with exponential backoff
+    and dead-lettered (status DEAD, with its last error) after max_attempts.
+    Jobs left RUNNING by a crashed worker are requeued after `timeout`
+    seconds. Commits that enqueue jobs wake the workers of this process;
+    other processes pick them up on their next poll.
+
+    Start it in the web process (see run.py) or on its own with
+    `flask run-jobs`.
+
+    Config keys: JOB_WORKERS, JOB_POLL_INTERVAL, JOB_TIMEOUT, JOB_MAX_ATTEMPTS,
+    JOB_BACKOFF, JOB_BACKOFF_MAX and JOB_RETENTION_DAYS.
+    """
+
+    def __init__(self, workers=2, poll_interval=1.0, timeout=300, retention_days=7):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.retention_days = retention_days
+        self.backoff_base = DEFAULT_BACKOFF
+        self.backoff_max = DEFAULT_BACKOFF_MAX
+        self.app = None
+        self.completed = 0
+        self.failed = 0
+        self._threads = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.workers = app.config.get('JOB_WORKERS', self.workers)
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', self.poll_interval)
+        self.timeout = app.config.get('JOB_TIMEOUT', self.timeout)
+        self.retention_days = app.config.get('JOB_RETENTION_DAYS', self.retention_days)
+        self.backoff_base = app.config.get('JOB_BACKOFF', self.backoff_base)
+        self.backoff_max = app.config.get('JOB_BACKOFF_MAX', self.backoff_max)
+        self.app = app
+        app.extensions['job_runner'] = self
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self, workers=None):
+        if self.running:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f'job-worker-{number}', daemon=True)
+            for number in range(workers or self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """
+        Wake idle workers; called after a commit that enqueued jobs.
+        """
+        self._wake.set()
+
+    def _claim(self):
+        from app.extensions import db
+        from app.booking_service import begin_write
+        from app.models import Job, JobStatus
+
+        while True:
+            now = datetime.utcnow()
+            try:
+                # Look for a due job with a plain read, so idle polls never
+                # take the write lock that request-path writes need
+                job_id = db.session.query(Job.id).filter(
+                    Job.status == JobStatus.QUEUED, Job.run_at <= now
+                ).order_by(Job.run_at).limit(1).scalar()
+                if job_id is None:
+                    db.session.rollback()
+                    return None
+                begin_write()
+                # Another worker may have claimed it since the read
+                claimed = db.session.query(Job).filter(
+                    Job.id == job_id, Job.status == JobStatus.QUEUED
+                ).update({
+                    'status': JobStatus.RUNNING, 'locked_at': now, 'attempts': Job.attempts + 1,
+                }, synchronize_session=False)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            if claimed:
+                return job_id
+
+    def _execute(self, job_id):
+        from app.extensions import db
+        from app.booking_service import begin_write
+        from app.models import Job, JobStatus
+
+        try:
+            # The claim already made this job ours; no lock is held while the
+            # handler works, only from its first write until the commit
+            job = Job.query.get(job_id)
+            handler = JOB_HANDLERS.get(job.name)
+            if handler is None:
+                raise LookupError(f'No handler registered for job {job.name!r}')
+            handler(**json.loads(job.payload))
+            begin_write()
+            job = Job.query.get(job_id)
+            job.status = JobStatus.DONE
+            job.finished_at = datetime.utcnow()
+            job.last_error = None
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self._fail(job_id, e)
+            return False
+        with self._lock:
+            self.completed += 1
+        return True
+
+    def _fail(self, job_id, error):
+        from app.extensions import db
+        from app.booking_service import begin_write
+        from app.models import Job, JobStatus
+
+        self.app.logger.warning('Job %s failed: %r', job_id, error)
+        with self._lock:
+            self.failed += 1
+        try:
+            begin_write()
+            job = Job.query.get(job_id)
+            job.last_error = f'{type(error).__name__}: {error}'
+            job.locked_at = None
+            if job.attempts >= job.max_attempts:
+                job.status = JobStatus.DEAD
+                job.finished_at = datetime.utcnow()
+            else:
+                job.status = JobStatus.QUEUED
+                job.run_at = datetime.utcnow() + timedelta(
+                    seconds=backoff(job.attempts, self.backoff_base, self.backoff_max))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def maintain(self):
+        """
+        Requeue jobs whose worker vanished and delete finished jobs past retention.
+        :return: (jobs requeued, jobs deleted).
+        """
+        from app.extensions import db
+        from app.models import Job, JobStatus
+
+        now = datetime.utcnow()
+        try:
+            requeued = db.session.query(Job).filter(
+                Job.status == JobStatus.RUNNING, Job.locked_at < now - timedelta(seconds=self.timeout)
+            ).update({'status': JobStatus.QUEUED, 'locked_at': None, 'run_at': now}, synchronize_session=False)
+            deleted = db.session.query(Job).filter(
+                Job.status == JobStatus.DONE, Job.finished_at < now - timedelta(days=self.retention_days)
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return requeued, deleted
+
+    def run_pending(self, limit=None):
+        """
+        Run due jobs in the calling thread until none are left.
+        :return: Number of jobs run, successfully or not.
+        """
+        count = 0
+        while limit is None or count < limit:
+            with self.app.app_context():
+                job_id = self._claim()
+                if job_id is None:
+                    return count
+                self._execute(job_id)
+            count += 1
+        return count
+
+    def _work(self):
+        last_maintenance = 0.0
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - last_maintenance > self.poll_interval * 60:
+                    with self.app.app_context():
+                        self.maintain()
+                    last_maintenance = time.monotonic()
+                if self.run_pending(limit=100) == 100:
+                    continue
+            except Exception:
+                self.app.logger.exception('Job worker error')
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def metrics(self):
+        from app.extensions import db
+        from app.models import Job, JobStatus
+
+        counts = dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all())
+        oldest = db.session.query(db.func.min(Job.run_at)).filter(Job.status == JobStatus.QUEUED).scalar()
+        with self._lock:
+            return {
+                **{status.value.lower(): counts.get(status, 0) for status in JobStatus},
+                'oldest_queued_age': (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+                'workers': sum(thread.is_alive() for thread in self._threads),
+                'completed': self.completed,
+                'failed': self.failed,
+            }
+
+
+@click.command('run-jobs')
+@click.option('--workers', type=int, help='Defaults to JOB_WORKERS.')
+@click.option('--once', is_flag=True, help='Run the jobs that are due and exit.')
+@with_appcontext
+def run_jobs_command(workers, once):
+    """Run queued background jobs, and the hold sweeper, until stopped."""
+    from app.extensions import job_runner, hold_sweeper
+
+    if once:
+        job_runner.maintain()
+        click.echo(f'Ran {job_runner.run_pending()} jobs.')
+        return
+    job_runner.start(workers)
+    hold_sweeper.start()
+    click.echo(f'Running jobs with {workers or job_runner.workers} workers; Ctrl+C to stop.')
+    try:
+        while job_runner.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        job_runner.stop()
+        hold_sweeper.stop()
+
+
+@click.command('retry-dead-jobs')
+@with_appcontext
+def retry_dead_jobs_command():
+    """Requeue dead-lettered jobs with a fresh set of attempts."""
+    from app.extensions import db
+    from app.models import Job, JobStatus
+
+    count = db.session.query(Job).filter(Job.status == JobStatus.DEAD).update({
+        'status': JobStatus.QUEUED, 'attempts': 0, 'run_at': datetime.utcnow(), 'finished_at': None,
+    }, synchronize_session=False)
+    db.session.commit()
+    click.echo(f'Requeued {count} jobs.')
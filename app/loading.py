@@ -0,0 +1,37 @@
+# app/loading.py
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.models import Room, Booking
+
+# Named relationship-loading profiles. Each lists the loader options for
+# everything the matching templates or serializers read from related rows, so
+# a listing costs the same number of queries at any page size. Functions,
+# because backrefs such as Booking.room only exist once mappers are configured.
+LOADING_PROFILES = {
+    # Room tables: scalar columns only; statuses come from occupancy_snapshot
+    'room_row': lambda: (),
+    # Room search cards: first photo for the image
+    'room_card': lambda: (selectinload(Room.photos),),
+    # Room edit form and API room payloads
+    'room_detail': lambda: (selectinload(Room.photos), selectinload(Room.amenities)),
+    # Booking lists that show the room
+    'booking_row': lambda: (joinedload(Booking.room),),
+    # User tables: scalar columns only
+    'user_row': lambda: (),
+}
+
+
+def loading_profile(name):
+    """
+    Loader options of a named profile.
+    :raises KeyError: If there is no such profile.
+    """
+    return LOADING_PROFILES[name]()
+
+
+def with_profile(query, name):
+    """
+    Apply a named loading profile to a query.
+    """
+    return query.options(*loading_profile(name))
@@ -1,7 +1,8 @@
 # app/models.py
 
+import json
 from datetime import datetime
-from app.extensions import db, bcrypt  
+from app.extensions import db, password_hasher, catalog_cache, availability_index, rate_calendar, job_runner
 from enum import Enum
 from flask_login import UserMixin
 from datetime import timedelta
@@ -11,12 +12,26 @@ class Photo(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     path = db.Column(db.String(255), nullable=False)
     room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=False)
+    content_hash = db.Column(db.String(64), index=True)
+    variants = db.Column(db.Text)  # JSON: variant name -> path under static
+
+    def variant(self, name):
+        """
+        Path of a resized variant, falling back to the original until it is ready.
+        :param name: Variant name, e.g. 'thumb' or 'medium'.
+        """
+        if self.variants:
+            return json.loads(self.variants).get(name, self.path)
+        return self.path
 
 
 class RoomType(Enum):
     SINGLE = "SINGLE"
     DOUBLE = "DOUBLE"
 
+# Weekday bitmask covering every day of the week (see RateRule.weekdays)
+ALL_WEEKDAYS = 0b1111111
+
 room_amenities = db.Table('room_amenities',
     db.Column('room_id', db.Integer, db.ForeignKey('room.id'), primary_key=True),
     db.Column('amenity_id', db.Integer, db.ForeignKey('amenity.id'), primary_key=True)
@@ -28,43 +43,81 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     first_name = db.Column(db.String(80))
     last_name = db.Column(db.String(80))
-    date_registered = db.Column(db.DateTime, default=datetime.utcnow)
+    date_registered = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     password_hash = db.Column(db.String(128))
     is_admin = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
     bookings = db.relationship('Booking', backref='guest', lazy=True)
 
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.verify(password, self.password_hash)
+
+    def rehash_password_if_needed(self, password):
+        """
+        Re-hash a just-verified password when the configured work factor changed.
+        :return: True if the stored hash was replaced (the caller commits).
+        """
+        if not password_hasher.needs_rehash(self.password_hash):
+            return False
+        self.set_password(password)
+        password_hasher.record_rehash()
+        return True
 
 class Room(db.Model):
     __tablename__ = 'room'
     id = db.Column(db.Integer, primary_key=True)
-    room_number = db.Column(db.String(50), nullable=False)
+    room_number = db.Column(db.String(50), nullable=False, index=True)
     type = db.Column(db.Enum(RoomType), nullable=False)
-    price = db.Column(db.Float, nullable=False)
+    price = db.Column(db.Float, nullable=False, index=True)
     description = db.Column(db.String(255), nullable=True)
+    # One bit per amenity (see Amenity.bit), kept in step with `amenities`
+    amenity_mask = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     amenities = db.relationship('Amenity', secondary=room_amenities, backref='room')  # Updated the backref
     bookings = db.relationship('Booking', backref='room', lazy=True)
     photos = db.relationship('Photo', backref='room', lazy=True)
 
+    @property
+    def image_url(self):
+        """
+        Static path of a small variant of the room's first photo, if any.
+        """
+        return self.photos[0].variant('medium') if self.photos else None
+
     @property
     def status(self):
         return 'occupied' if self.is_occupied(datetime.utcnow()) else 'available'
 
+    @classmethod
+    def occupancy_snapshot(cls, rooms, date=None):
+        """
+        Compute the status of many rooms with a single room_night query.
+        :param rooms: Rooms (or room ids) to compute the status for.
+        :param date: Date to check, defaults to now.
+        :return: Dict mapping room id to 'occupied' or 'available'.
+        """
+        date = date or datetime.utcnow()
+        room_ids = [room if isinstance(room, int) else room.id for room in rooms]
+        if not room_ids:
+            return {}
+        # One primary-key seek per room, so the cost follows the page size
+        occupied = {
+            room_id for room_id, in db.session.query(RoomNight.room_id).filter(
+                RoomNight.room_id.in_(room_ids),
+                RoomNight.night == date.date()
+            )
+        }
+        return {room_id: 'occupied' if room_id in occupied else 'available' for room_id in room_ids}
+
     def is_occupied(self, date):
         """
         Check if the room is occupied on a given date.
         :param date: Date to check.
         :return: Boolean indicating if room is occupied.
         """
-        for booking in self.bookings:
-            if booking.start_date <= date <= booking.end_date:
-                return True
-        return False
+        return availability_index.overlaps(self.id, date, date)
 
     def is_available(self, check_in_date, check_out_date):
         """
@@ -73,21 +126,62 @@ class Room(db.Model):
         :param check_out_date: End date for checking availability.
         :return: Boolean indicating if room is available.
         """
-        for booking in self.bookings:
-            if not (booking.end_date < check_in_date or booking.start_date > check_out_date):
-                return False
-        return True
+        return not availability_index.overlaps(self.id, check_in_date, check_out_date)
 
 class Amenity(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True)
 
+    # Room.amenity_mask is a signed 64-bit integer in SQLite
+    MAX_ID = 63
+
+    @property
+    def bit(self):
+        return Amenity.bit_for(self.id)
+
+    @staticmethod
+    def bit_for(amenity_id):
+        """
+        The amenity's bit in Room.amenity_mask.
+        :raises ValueError: If the id does not fit in the mask.
+        """
+        if not 1 <= amenity_id <= Amenity.MAX_ID:
+            raise ValueError(f'Amenity id {amenity_id} does not fit in the amenity mask')
+        return 1 << (amenity_id - 1)
+
+    @staticmethod
+    def mask_for(amenity_ids):
+        """
+        Combine amenity ids into a mask; a room has all of them when
+        room.amenity_mask & mask == mask.
+        """
+        mask = 0
+        for amenity_id in amenity_ids:
+            mask |= Amenity.bit_for(amenity_id)
+        return mask
+
 class BookingStatus(Enum):
     PENDING = "PENDING"
     CONFIRMED = "CONFIRMED"
     CANCELLED = "CANCELLED"
 
+# Condition for bookings that hold their room; partial indexes below use it
+# so cancelled history never weighs on availability lookups.
+LIVE_BOOKING = db.text("status != 'CANCELLED'")
+
 class Booking(db.Model):
+    __table_args__ = (
+        db.Index('ix_booking_live_room_dates', 'room_id', 'start_date', 'end_date',
+                 sqlite_where=LIVE_BOOKING, postgresql_where=LIVE_BOOKING),
+        # The partial index above cannot serve queries that do not filter out
+        # cancelled bookings, e.g. Room.bookings
+        db.Index('ix_booking_room_id', 'room_id'),
+        # Lapsed holds for the sweeper, see app/holds.py
+        db.Index('ix_booking_hold_expiry', 'expires_at',
+                 sqlite_where=db.text("status = 'PENDING'"), postgresql_where=db.text("status = 'PENDING'")),
+        db.Index('ix_booking_dates', 'start_date', 'end_date'),
+        db.Index('ix_booking_user_start', 'user_id', 'start_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     room_id = db.Column(db.Integer, db.ForeignKey('room.id'), nullable=False)
@@ -95,45 +189,476 @@ class Booking(db.Model):
     end_date = db.Column(db.DateTime)
     total_price = db.Column(db.Float)
     status = db.Column(db.Enum(BookingStatus), default=BookingStatus.PENDING)
+    # When a PENDING booking stops holding its room unless confirmed; null
+    # for confirmed bookings and for pending ones that never lapse
+    expires_at = db.Column(db.DateTime)
+
+    def is_expired(self, now=None):
+        """
+        Whether this is a pending hold past its expiry time.
+        """
+        return self.status == BookingStatus.PENDING and self.expires_at is not None \
+            and self.expires_at <= (now or datetime.utcnow())
 
-    def calculate_total_price(self):
+    def calculate_total_price(self, room=None):
         """
-        Calculate the total price based on the number of days and room price.
+        Calculate the total price of the stay from the rate calendar: the
+        nightly rates of the room plus any length-of-stay discount.
         Ensure the associated room is present before attempting the calculation.
+        The caller is responsible for committing the booking.
+        :param room: Room to price against, defaults to the associated room.
+        :return: The calculated total price.
         """
-        if not self.room:
+        room = room or self.room or (Room.query.get(self.room_id) if self.room_id else None)
+        if not room:
             raise ValueError("Booking has no associated room!")
-        num_days = (self.end_date - self.start_date).days
-        self.total_price = num_days * self.room.price
-        # Optionally, if you want to automatically save this to the database after calculating:
-        db.session.add(self)
-        db.session.commit()
+        self.total_price = rate_calendar.price_stay(room, self.start_date, self.end_date)['total_price']
+        return self.total_price
 
     @db.validates('start_date', 'end_date')
     def validate_dates(self, key, date):
-        if key == "start_date" and date >= self.end_date:
+        if key == "start_date" and self.end_date is not None and date >= self.end_date:
             raise ValueError("Start date must be before end date")
-        elif key == "end_date" and date <= self.start_date:
+        elif key == "end_date" and self.start_date is not None and date <= self.start_date:
             raise ValueError("End date must be after start date")
         return date
 
 
+class RoomNight(db.Model):
+    """
+    One row per room per night held by a live booking.
+    The primary key on (room_id, night) makes the database reject double bookings.
+    """
+    __tablename__ = 'room_night'
+    __table_args__ = (
+        db.Index('ix_room_night_night', 'night'),
+        db.Index('ix_room_night_booking_id', 'booking_id'),
+    )
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id'), primary_key=True)
+    night = db.Column(db.Date, primary_key=True)
+    booking_id = db.Column(db.Integer, db.ForeignKey('booking.id'), nullable=False)
+
+    @staticmethod
+    def nights(start_date, end_date):
+        """
+        List the nights of a stay: every date from check-in up to, but not
+        including, check-out.
+        """
+        first, last = start_date.date(), end_date.date()
+        return [first + timedelta(days=offset) for offset in range((last - first).days)]
+
+    @classmethod
+    def is_claimed(cls, room_id, start_date, end_date):
+        """
+        Check if any night of a stay is already held, with one primary key range seek.
+        """
+        return db.session.query(
+            cls.query.filter(
+                cls.room_id == room_id,
+                cls.night >= start_date.date(),
+                cls.night < end_date.date()
+            ).exists()
+        ).scalar()
+
+
+class DailyRollup(db.Model):
+    """
+    Per-day booking totals by room type and booking status, kept up to date
+    from the booking write path (through the job queue, moments after each
+    commit) so dashboards never aggregate the booking table.
+    room_nights and revenue are counted on each night of a stay; bookings is
+    counted on the check-in day.
+    """
+    __tablename__ = 'daily_rollup'
+    day = db.Column(db.Date, primary_key=True)
+    room_type = db.Column(db.Enum(RoomType), primary_key=True)
+    status = db.Column(db.Enum(BookingStatus), primary_key=True)
+    room_nights = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def contributions(room_type, start_date, end_date, status, total_price):
+        """
+        What one booking adds to the rollups.
+        :return: Dict mapping (day, room_type, status) to [room_nights, revenue, bookings].
+        """
+        if room_type is None or not start_date or not end_date:
+            return {}
+        status = status or BookingStatus.PENDING
+        nights = RoomNight.nights(start_date, end_date)
+        nightly_revenue = (total_price or 0.0) / len(nights) if nights else 0.0
+        result = {(night, room_type, status): [1, nightly_revenue, 0] for night in nights}
+        result.setdefault((start_date.date(), room_type, status), [0, 0.0, 0])[2] += 1
+        return result
+
+
+
+class RateRule(db.Model):
+    """
+    Nightly rate for a season and set of weekdays, for one room, one room type
+    or (with neither) every room. A rule either sets the price outright or
+    scales the room's list price by `factor`. Where several rules cover a
+    night the highest priority wins, and at equal priority a room rule beats a
+    room type rule, which beats a global one. Nights no rule covers are sold
+    at Room.price. Compiled for pricing by app/rates.py.
+    """
+    __tablename__ = 'rate_rule'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id'), index=True)
+    room_type = db.Column(db.Enum(RoomType))
+    # First night covered and the night after the last one; open when null
+    start_day = db.Column(db.Date)
+    end_day = db.Column(db.Date)
+    # Bit n set means the rule applies on weekday n (Monday is 0)
+    weekdays = db.Column(db.Integer, nullable=False, default=ALL_WEEKDAYS, server_default=str(ALL_WEEKDAYS))
+    price = db.Column(db.Float)
+    factor = db.Column(db.Float, nullable=False, default=1.0, server_default='1.0')
+    priority = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    @staticmethod
+    def weekday_mask(weekdays):
+        """
+        Bitmask for an iterable of weekday numbers (Monday is 0).
+        """
+        mask = 0
+        for weekday in weekdays:
+            if not 0 <= int(weekday) <= 6:
+                raise ValueError('Weekdays are numbered 0 (Monday) to 6 (Sunday).')
+            mask |= 1 << int(weekday)
+        return mask
+
+
+class StayDiscount(db.Model):
+    """
+    Length-of-stay discount: stays of at least `min_nights` nights get
+    `percent` off the total, for one room type or (when null) every room.
+    Only the largest applicable discount is given.
+    """
+    __tablename__ = 'stay_discount'
+    id = db.Column(db.Integer, primary_key=True)
+    room_type = db.Column(db.Enum(RoomType))
+    min_nights = db.Column(db.Integer, nullable=False)
+    percent = db.Column(db.Float, nullable=False)
+
+
+class JobStatus(Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    DEAD = "DEAD"
+
+
+class Job(db.Model):
+    """
+    Durable background job; see app/jobs.py. Rows are written in the same
+    transaction as the change that needs them, so a job exists exactly when
+    that change committed.
+    """
+    __tablename__ = 'job'
+    __table_args__ = (
+        db.Index('ix_job_queued_run_at', 'run_at',
+                 sqlite_where=db.text("status = 'QUEUED'"), postgresql_where=db.text("status = 'QUEUED'")),
+        db.Index('ix_job_running_locked_at', 'locked_at',
+                 sqlite_where=db.text("status = 'RUNNING'"), postgresql_where=db.text("status = 'RUNNING'")),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON keyword arguments
+    status = db.Column(db.Enum(JobStatus), nullable=False, default=JobStatus.QUEUED)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+
 # Below the Booking class, add these hooks using the event API:
 
-from sqlalchemy import event
+from sqlalchemy import event, inspect
 
-def after_insert_booking_listener(mapper, connection, target):
+def before_insert_booking_listener(mapper, connection, target):
     """
-    After a booking is inserted into the database, calculate its total price.
+    Before a booking is inserted into the database, calculate its total price
+    if the write path has not already done so.
     """
-    target.calculate_total_price()
+    if target.total_price is None:
+        target.calculate_total_price()
 
-def after_update_booking_listener(mapper, connection, target):
+def before_update_booking_listener(mapper, connection, target):
     """
-    After a booking is updated in the database, recalculate its total price.
+    Before a booking is updated in the database, recalculate its total price
+    when its dates or room changed.
     """
-    target.calculate_total_price()
+    state = inspect(target)
+    if any(state.attrs[key].history.has_changes() for key in ('start_date', 'end_date', 'room_id')):
+        target.calculate_total_price()
 
 # Listen to the appropriate events
-event.listen(Booking, 'after_insert', after_insert_booking_listener)
-event.listen(Booking, 'after_update', after_update_booking_listener)
+event.listen(Booking, 'before_insert', before_insert_booking_listener)
+event.listen(Booking, 'before_update', before_update_booking_listener)
+
+
+# Keep the availability index in sync with committed bookings.
+# Changes are collected per session during flush and applied on commit.
+
+from sqlalchemy.orm import Session, object_session, attributes
+
+def _queue_availability_change(target, holds_room=True):
+    session = object_session(target)
+    if session is None:
+        return
+    if holds_room and target.status != BookingStatus.CANCELLED:
+        change = (target.id, target.room_id, target.start_date, target.end_date)
+    else:
+        change = (target.id, target.room_id, None, None)
+    session.info.setdefault('availability_changes', []).append(change)
+
+def after_insert_availability_listener(mapper, connection, target):
+    _queue_availability_change(target)
+
+def after_update_availability_listener(mapper, connection, target):
+    _queue_availability_change(target)
+
+def after_delete_availability_listener(mapper, connection, target):
+    _queue_availability_change(target, holds_room=False)
+
+def after_commit_availability_listener(session):
+    changes = session.info.pop('availability_changes', None)
+    if changes:
+        availability_index.apply(changes)
+
+def after_rollback_availability_listener(session):
+    session.info.pop('availability_changes', None)
+
+event.listen(Booking, 'after_insert', after_insert_availability_listener)
+event.listen(Booking, 'after_update', after_update_availability_listener)
+event.listen(Booking, 'after_delete', after_delete_availability_listener)
+event.listen(Session, 'after_commit', after_commit_availability_listener)
+event.listen(Session, 'after_rollback', after_rollback_availability_listener)
+
+
+# Keep the room_night inventory in step with bookings. These run inside the
+# flush, so a clash on (room_id, night) fails the same transaction.
+
+def _room_night_rows(booking):
+    if booking.status == BookingStatus.CANCELLED or not booking.start_date or not booking.end_date:
+        return []
+    return [
+        {'room_id': booking.room_id, 'night': night, 'booking_id': booking.id}
+        for night in RoomNight.nights(booking.start_date, booking.end_date)
+    ]
+
+def after_insert_room_night_listener(mapper, connection, target):
+    rows = _room_night_rows(target)
+    if rows:
+        connection.execute(RoomNight.__table__.insert(), rows)
+
+def after_update_room_night_listener(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[key].history.has_changes() for key in ('start_date', 'end_date', 'room_id', 'status')):
+        return
+    connection.execute(RoomNight.__table__.delete().where(RoomNight.booking_id == target.id))
+    rows = _room_night_rows(target)
+    if rows:
+        connection.execute(RoomNight.__table__.insert(), rows)
+
+def before_delete_room_night_listener(mapper, connection, target):
+    connection.execute(RoomNight.__table__.delete().where(RoomNight.booking_id == target.id))
+
+event.listen(Booking, 'after_insert', after_insert_room_night_listener)
+event.listen(Booking, 'after_update', after_update_room_night_listener)
+event.listen(Booking, 'before_delete', before_delete_room_night_listener)
+
+
+# Bump the room catalog version when anything shown in room listings or
+# search results changes, once the change is committed.
+
+CATALOG_MODELS = (Room, Amenity, Photo, Booking, RateRule, StayDiscount)
+
+def after_flush_catalog_listener(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, CATALOG_MODELS):
+            session.info['catalog_changed'] = True
+            return
+
+def after_commit_catalog_listener(session):
+    if session.info.pop('catalog_changed', False):
+        catalog_cache.bump()
+
+def after_rollback_catalog_listener(session):
+    session.info.pop('catalog_changed', None)
+
+event.listen(Session, 'after_flush', after_flush_catalog_listener)
+event.listen(Session, 'after_commit', after_commit_catalog_listener)
+event.listen(Session, 'after_rollback', after_rollback_catalog_listener)
+
+
+
+# Recompile the rate calendar once rate rules or discounts are committed.
+
+RATE_MODELS = (RateRule, StayDiscount)
+
+def after_flush_rates_listener(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, RATE_MODELS):
+            session.info['rates_changed'] = True
+            return
+
+def after_commit_rates_listener(session):
+    if session.info.pop('rates_changed', False):
+        rate_calendar.invalidate()
+
+def after_rollback_rates_listener(session):
+    session.info.pop('rates_changed', None)
+
+event.listen(Session, 'after_flush', after_flush_rates_listener)
+event.listen(Session, 'after_commit', after_commit_rates_listener)
+event.listen(Session, 'after_rollback', after_rollback_rates_listener)
+
+# Keep the daily rollups in step with bookings. Each change queues an
+# apply_rollup job inside the same flush (see app/rollups.py), so the write
+# only pays for one INSERT and the rollups catch up once the job queue runs
+# it. An update subtracts what the booking used to contribute and adds the new one.
+
+def apply_rollup(connection, contributions, sign):
+    """
+    Add (sign=1) or subtract (sign=-1) contributions from DailyRollup.contributions.
+    Used by the apply_rollup job in app/rollups.py.
+    """
+    table = DailyRollup.__table__
+    for (day, room_type, status), (room_nights, revenue, bookings) in contributions.items():
+        key = (table.c.day == day) & (table.c.room_type == room_type) & (table.c.status == status)
+        result = connection.execute(table.update().where(key).values(
+            room_nights=table.c.room_nights + sign * room_nights,
+            revenue=table.c.revenue + sign * revenue,
+            bookings=table.c.bookings + sign * bookings
+        ))
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(
+                day=day, room_type=room_type, status=status,
+                room_nights=sign * room_nights, revenue=sign * revenue, bookings=sign * bookings
+            ))
+
+def rollup_entry(room_id, start_date, end_date, status, total_price, sign):
+    """
+    JSON-ready description of one booking's rollup contribution, for the
+    apply_rollup job.
+    """
+    if not start_date or not end_date:
+        return None
+    return [room_id, start_date.isoformat(), end_date.isoformat(),
+            (status or BookingStatus.PENDING).value, total_price, sign]
+
+def queue_rollup(connection, entries):
+    from app.jobs import enqueue
+
+    entries = [entry for entry in entries if entry]
+    if entries:
+        enqueue('apply_rollup', {'entries': entries}, connection=connection)
+
+def _booking_rollup_entry(booking, sign, values=None):
+    values = values or {}
+    get = lambda key: values[key] if key in values else getattr(booking, key)
+    return rollup_entry(get('room_id'), get('start_date'), get('end_date'), get('status'), get('total_price'), sign)
+
+def after_insert_rollup_listener(mapper, connection, target):
+    queue_rollup(connection, [_booking_rollup_entry(target, 1)])
+
+def after_update_rollup_listener(mapper, connection, target):
+    state = inspect(target)
+    keys = ('room_id', 'start_date', 'end_date', 'status', 'total_price')
+    previous = {}
+    for key in keys:
+        history = state.attrs[key].history
+        if history.has_changes():
+            previous[key] = history.deleted[0] if history.deleted else None
+    if not previous:
+        return
+    queue_rollup(connection, [_booking_rollup_entry(target, -1, previous), _booking_rollup_entry(target, 1)])
+
+def after_delete_rollup_listener(mapper, connection, target):
+    queue_rollup(connection, [_booking_rollup_entry(target, -1)])
+
+event.listen(Booking, 'after_insert', after_insert_rollup_listener)
+event.listen(Booking, 'after_update', after_update_rollup_listener)
+event.listen(Booking, 'after_delete', after_delete_rollup_listener)
+
+
+# Wake this process's job workers once a commit has enqueued jobs.
+
+def after_commit_jobs_listener(session):
+    if session.info.pop('jobs_enqueued', False):
+        job_runner.notify()
+
+def after_rollback_jobs_listener(session):
+    session.info.pop('jobs_enqueued', None)
+
+event.listen(Session, 'after_commit', after_commit_jobs_listener)
+event.listen(Session, 'after_rollback', after_rollback_jobs_listener)
+
+
+# Keep Room.amenity_mask in step with room.amenities. Runs after the flush so
+# newly created amenities already have their ids; history still shows what
+# the flush changed. Deleting an amenity clears its bit on every room.
+
+def after_flush_amenity_mask_listener(session, flush_context):
+    connection = session.connection()
+    for instance in session.deleted:
+        if isinstance(instance, Amenity):
+            connection.execute(Room.__table__.update().where(
+                Room.amenity_mask.op('&')(instance.bit) != 0
+            ).values(amenity_mask=Room.amenity_mask.op('&')(~instance.bit)))
+    for instance in (*session.new, *session.dirty):
+        if isinstance(instance, Room) and instance not in session.deleted \
+                and attributes.get_history(instance, 'amenities').has_changes():
+            mask = Amenity.mask_for(amenity.id for amenity in instance.amenities)
+            connection.execute(Room.__table__.update().where(Room.id == instance.id).values(amenity_mask=mask))
+            attributes.set_committed_value(instance, 'amenity_mask', mask)
+
+event.listen(Session, 'after_flush', after_flush_amenity_mask_listener)
+
+
+# Full-text index over room number, description and amenity names. It is an
+# SQLite FTS5 table keyed by room id and kept in sync by triggers, so Core
+# bulk inserts and raw SQL stay indexed along with ORM changes. Created with
+# the schema on SQLite; see app/search.py for the queries.
+
+ROOM_SEARCH_AMENITIES = (
+    "(SELECT coalesce(group_concat(amenity.name, ' '), '') FROM room_amenities "
+    "JOIN amenity ON amenity.id = room_amenities.amenity_id WHERE room_amenities.room_id = {room_id})"
+)
+
+ROOM_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS room_search USING fts5("
+    "room_number, description, amenities, tokenize = 'unicode61', prefix = '2 3')",
+    "CREATE TRIGGER IF NOT EXISTS room_search_ai AFTER INSERT ON room BEGIN "
+    "INSERT INTO room_search (rowid, room_number, description, amenities) "
+    "VALUES (new.id, new.room_number, coalesce(new.description, ''), "
+    + ROOM_SEARCH_AMENITIES.format(room_id='new.id') + "); END",
+    "CREATE TRIGGER IF NOT EXISTS room_search_au AFTER UPDATE OF room_number, description ON room BEGIN "
+    "UPDATE room_search SET room_number = new.room_number, description = coalesce(new.description, '') "
+    "WHERE rowid = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS room_search_ad AFTER DELETE ON room BEGIN "
+    "DELETE FROM room_search WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS room_search_amenity_ai AFTER INSERT ON room_amenities BEGIN "
+    "UPDATE room_search SET amenities = " + ROOM_SEARCH_AMENITIES.format(room_id='new.room_id')
+    + " WHERE rowid = new.room_id; END",
+    "CREATE TRIGGER IF NOT EXISTS room_search_amenity_ad AFTER DELETE ON room_amenities BEGIN "
+    "UPDATE room_search SET amenities = " + ROOM_SEARCH_AMENITIES.format(room_id='old.room_id')
+    + " WHERE rowid = old.room_id; END",
+    "CREATE TRIGGER IF NOT EXISTS room_search_amenity_au AFTER UPDATE OF name ON amenity BEGIN "
+    "UPDATE room_search SET amenities = " + ROOM_SEARCH_AMENITIES.format(room_id='room_search.rowid')
+    + " WHERE rowid IN (SELECT room_id FROM room_amenities WHERE amenity_id = new.id); END",
+]
+
+def after_create_room_search_listener(metadata, connection, **kw):
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in ROOM_SEARCH_DDL:
+        connection.exec_driver_sql(statement)
+
+event.listen(db.metadata, 'after_create', after_create_room_search_listener)
@@ -0,0 +1,93 @@
+# app/occupancy_calendar.py
+
+import base64
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import type_coerce
+
+from app.extensions import db
+from app.models import Room, RoomNight
+
+# Longest window a single calendar request may cover
+MAX_CALENDAR_DAYS = 366
+
+
+def held_nights_query(start_day, end_day):
+    """
+    (room id, night) of every held night in [start_day, end_day), read as
+    plain strings for NumPy to parse in bulk. Checked by app/query_plans.py.
+    """
+    return db.session.query(
+        RoomNight.room_id, type_coerce(RoomNight.night, db.String)
+    ).filter(
+        RoomNight.night >= start_day,
+        RoomNight.night < end_day
+    )
+
+
+def occupancy_matrix(room_ids, start_day, days):
+    """
+    Build a rooms x nights occupancy matrix for the window starting at start_day.
+    The held nights in the window are read from room_night in one range scan
+    of ix_room_night_night, so the cost follows the window and not the length
+    of the booking history, and set with one fancy-indexing assignment.
+    :param room_ids: Sorted list of room ids, one matrix row each.
+    :return: Boolean NumPy array of shape (len(room_ids), days).
+    """
+    window_start = np.datetime64(start_day, 'D')
+    end_day = start_day + timedelta(days=days)
+    rows = held_nights_query(start_day, end_day).all()
+
+    matrix = np.zeros((len(room_ids), days), dtype=bool)
+    if rows and room_ids:
+        night_rooms, nights = zip(*rows)
+        night_rooms = np.asarray(night_rooms, dtype=np.int64)
+        ids = np.asarray(room_ids, dtype=np.int64)
+        positions = np.searchsorted(ids, night_rooms)
+        known = (positions < len(ids)) & (ids[np.minimum(positions, len(ids) - 1)] == night_rooms)
+        columns = (np.asarray(nights, dtype='U10').astype('datetime64[D]') - window_start).astype(np.int64)
+        matrix[positions[known], columns[known]] = True
+    return matrix
+
+
+def encode_bitmap(matrix):
+    """
+    Pack each row into bits (first night in the most significant bit) and
+    base64 the rows back to back. Each row takes ceil(days / 8) bytes.
+    """
+    return base64.b64encode(np.packbits(matrix, axis=1).tobytes()).decode('ascii')
+
+
+def encode_rows(matrix):
+    """
+    One '0'/'1' string per room, one character per night.
+    """
+    characters = np.where(matrix, ord('1'), ord('0')).astype(np.uint8)
+    return [row.tobytes().decode('ascii') for row in characters]
+
+
+def availability_calendar(start_day, days, room_type=None, encoding='bitmap'):
+    """
+    Month-at-a-glance occupancy for every room, ready to serialise to JSON.
+    :param encoding: 'bitmap' for packed base64 rows, 'rows' for '0'/'1' strings.
+    """
+    query = db.session.query(Room.id, Room.room_number).order_by(Room.id)
+    if room_type:
+        query = query.filter(Room.type == room_type)
+    rooms = query.all()
+    matrix = occupancy_matrix([room_id for room_id, _ in rooms], start_day, days)
+
+    result = {
+        'start_date': start_day.isoformat(),
+        'days': days,
+        'rooms': [{'id': room_id, 'room_number': room_number} for room_id, room_number in rooms],
+        'occupied_nights': int(matrix.sum()),
+        'encoding': encoding,
+    }
+    if encoding == 'rows':
+        result['rows'] = encode_rows(matrix)
+    else:
+        result['row_bytes'] = (days + 7) // 8
+        result['bitmap'] = encode_bitmap(matrix)
+    return result
@@ -0,0 +1,125 @@
+# app/pagination.py
+
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+# Default and maximum number of rows on one page
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded or does not match the sort."""
+
+
+class KeysetPage:
+    """
+    One page of a keyset (seek) paginated listing.
+    :param items: Rows on this page.
+    :param sort: Sort key the page was built with.
+    :param next_cursor: Token for the following page, or None on the last page.
+    """
+
+    def __init__(self, items, sort, next_cursor, per_page):
+        self.items = items
+        self.sort = sort
+        self.next_cursor = next_cursor
+        self.per_page = per_page
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _to_json(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _from_json(value, column):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(sort, values):
+    payload = json.dumps({'s': sort, 'v': [_to_json(value) for value in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort, columns):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = payload['v']
+        if payload['s'] != sort or len(values) != len(columns):
+            raise InvalidCursor('Cursor does not match the requested sort.')
+        return [_from_json(value, column) for value, column in zip(values, columns)]
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('Malformed cursor.')
+
+
+def keyset_paginate(query, sort_options, sort=None, cursor=None, per_page=None):
+    """
+    Paginate a query by seeking past the last row of the previous page.
+    Every page costs one index range scan, no matter how deep it is.
+    :param query: Query to paginate.
+    :param sort_options: Dict mapping a sort key to its columns. The columns must
+        end in a unique column and be covered by an index, in that order.
+    :param sort: Sort key, optionally prefixed with '-' for descending order.
+    :param cursor: Token from a previous page's next_cursor.
+    :param per_page: Rows per page, capped at MAX_PER_PAGE.
+    :return: A KeysetPage.
+    """
+    default_sort = next(iter(sort_options))
+    sort = sort or default_sort
+    descending = sort.startswith('-')
+    columns = sort_options.get(sort.lstrip('-'))
+    if columns is None:
+        sort, descending, columns = default_sort, False, sort_options[default_sort]
+    per_page = min(max(int(per_page or DEFAULT_PER_PAGE), 1), MAX_PER_PAGE)
+
+    if cursor:
+        values = decode_cursor(cursor, sort, columns)
+        key, last = tuple_(*columns), tuple_(*values)
+        query = query.filter(key < last if descending else key > last)
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    rows = query.limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last_row = rows[-1]
+        next_cursor = encode_cursor(sort, [getattr(last_row, column.key) for column in columns])
+    return KeysetPage(rows, sort, next_cursor, per_page)
+
+
+def paginate_request(query, sort_options, args, per_page=None):
+    """
+    Keyset-paginate a query from request arguments ('sort', 'cursor', 'per_page').
+    An invalid cursor falls back to the first page.
+    """
+    sort = args.get('sort')
+    per_page = args.get('per_page', per_page, type=int)
+    try:
+        return keyset_paginate(query, sort_options, sort, args.get('cursor'), per_page)
+    except InvalidCursor:
+        return keyset_paginate(query, sort_options, sort, None, per_page)
@@ -0,0 +1,168 @@
+# app/passwords.py
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+# bcrypt only looks at the first 72 bytes of a password
+MAX_PASSWORD_BYTES = 72
+
+
+class HashingBusyError(RuntimeError):
+    """Raised when no hashing slot frees up within the configured timeout."""
+
+
+class PasswordHasher:
+    """
+    Password hashing service backed by a bounded thread pool.
+
+    bcrypt releases the GIL while it hashes, so a small pool lets hashing use
+    every core while the number of hashes in flight stays capped. Requests
+    beyond the cap wait for a slot and give up after `timeout` seconds.
+
+    Config keys: BCRYPT_LOG_ROUNDS (work factor), PASSWORD_HASH_WORKERS,
+    PASSWORD_HASH_QUEUE_SIZE and PASSWORD_HASH_TIMEOUT.
+    """
+
+    def __init__(self, rounds=12, workers=None, queue_size=None, timeout=10.0, latency_samples=1024):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size or self.workers * 4
+        self.timeout = timeout
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._latencies = deque(maxlen=latency_samples)
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', self.rounds)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.queue_size = app.config.get('PASSWORD_HASH_QUEUE_SIZE', max(self.queue_size, self.workers))
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self.shutdown()
+        app.extensions['password_hasher'] = self
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+                self._slots = threading.BoundedSemaphore(self.queue_size)
+            return self._executor, self._slots
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor, self._slots = self._executor, None, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _timed(self, fn, *args):
+        with self._lock:
+            self._waiting -= 1
+            self._running += 1
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._latency_total += elapsed
+                self._latency_max = max(self._latency_max, elapsed)
+                self._latencies.append(elapsed)
+
+    def _run(self, fn, *args):
+        executor, slots = self._pool()
+        if not slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._rejected += 1
+            raise HashingBusyError('Password hashing is busy. Please try again.')
+        try:
+            with self._lock:
+                self._waiting += 1
+            return executor.submit(self._timed, fn, *args).result()
+        finally:
+            slots.release()
+
+    @staticmethod
+    def _encode(password):
+        return password.encode('utf-8')[:MAX_PASSWORD_BYTES]
+
+    def _hash(self, password, rounds):
+        return bcrypt.hashpw(self._encode(password), bcrypt.gensalt(rounds)).decode('utf-8')
+
+    def _verify(self, password, password_hash):
+        return bcrypt.checkpw(self._encode(password), password_hash.encode('utf-8'))
+
+    def hash(self, password):
+        """
+        Hash a password with the configured work factor.
+        :return: The bcrypt hash as a string.
+        """
+        return self._run(self._hash, password, self.rounds)
+
+    def verify(self, password, password_hash):
+        """
+        Check a password against a stored bcrypt hash.
+        """
+        if not password_hash:
+            return False
+        try:
+            return self._run(self._verify, password, password_hash)
+        except ValueError:
+            # Not a bcrypt hash
+            return False
+
+    @staticmethod
+    def cost(password_hash):
+        """
+        Read the work factor out of a hash like "$2b$12$...".
+        """
+        try:
+            return int(password_hash.split('$')[2])
+        except (AttributeError, IndexError, ValueError):
+            return None
+
+    def needs_rehash(self, password_hash):
+        """
+        Check if a stored hash was made with a different work factor.
+        """
+        return self.cost(password_hash) != self.rounds
+
+    def record_rehash(self):
+        with self._lock:
+            self._rehashed += 1
+
+    def metrics(self):
+        """
+        Snapshot of queue depth, throughput and hash latency in seconds.
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            completed = self._completed
+            snapshot = {
+                'workers': self.workers,
+                'rounds': self.rounds,
+                'queue_size': self.queue_size,
+                'queue_depth': self._waiting,
+                'running': self._running,
+                'completed': completed,
+                'rejected': self._rejected,
+                'rehashed': self._rehashed,
+                'latency_avg': self._latency_total / completed if completed else 0.0,
+                'latency_max': self._latency_max,
+            }
+        for name, quantile in (('latency_p50', 0.50), ('latency_p95', 0.95), ('latency_p99', 0.99)):
+            snapshot[name] = latencies[min(int(quantile * len(latencies)), len(latencies) - 1)] if latencies else 0.0
+        return snapshot
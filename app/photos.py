@@ -0,0 +1,181 @@
+# app/photos.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from app.jobs import job, enqueue
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it only originals are served
+    Image = None
+
+# Directory under the static folder where room photos are stored
+PHOTO_DIRECTORY = 'room_photos'
+
+# Variant name -> longest edge in pixels
+PHOTO_SIZES = {'thumb': 320, 'medium': 800, 'large': 1600}
+
+# Chunk size used when streaming uploads to disk
+CHUNK_SIZE = 64 * 1024
+
+
+def variant_filename(content_hash, name):
+    return f'{content_hash}_{name}.webp'
+
+
+def render_variants(source_path, output_dir, content_hash, sizes):
+    """
+    Resize one photo into WebP variants. Runs in a worker process.
+    :return: Dict mapping variant name to its path relative to the static folder.
+    """
+    variants = {}
+    with Image.open(source_path) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        for name, edge in sizes.items():
+            filename = variant_filename(content_hash, name)
+            variant = image.copy()
+            variant.thumbnail((edge, edge))
+            variant.save(os.path.join(output_dir, filename), 'WEBP', quality=80, method=4)
+            variants[name] = f'{PHOTO_DIRECTORY}/{filename}'
+    return variants
+
+
+class StoredPhoto:
+    """
+    Result of saving an upload: where the original lives and which variants
+    are already on disk (set when an identical file was processed before).
+    """
+
+    def __init__(self, content_hash, path, variants=None):
+        self.content_hash = content_hash
+        self.path = path
+        self.variants = variants
+
+    def variants_json(self):
+        return json.dumps(self.variants) if self.variants else None
+
+
+class PhotoProcessor:
+    """
+    Upload pipeline for room photos.
+
+    Uploads are streamed to disk while being hashed and stored under their
+    SHA-256, so identical files are kept once and never overwrite each other.
+    Resizing into PHOTO_SIZES is queued as a durable job together with the
+    Photo rows and runs on a local process pool; the Photo rows are updated
+    with their variants when the work finishes.
+
+    Config keys: PHOTO_WORKERS and PHOTO_SIZES.
+    """
+
+    def __init__(self, workers=2, sizes=None):
+        self.workers = workers
+        self.sizes = dict(sizes or PHOTO_SIZES)
+        self.app = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.workers = app.config.get('PHOTO_WORKERS', self.workers)
+        self.sizes = dict(app.config.get('PHOTO_SIZES', self.sizes))
+        self.app = app
+        app.extensions['photo_processor'] = self
+
+    @property
+    def enabled(self):
+        return Image is not None
+
+    def directory(self):
+        path = os.path.join(self.app.static_folder, PHOTO_DIRECTORY)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _existing_variants(self, content_hash):
+        directory = self.directory()
+        variants = {}
+        for name in self.sizes:
+            filename = variant_filename(content_hash, name)
+            if not os.path.exists(os.path.join(directory, filename)):
+                return None
+            variants[name] = f'{PHOTO_DIRECTORY}/{filename}'
+        return variants
+
+    def save(self, file_storage):
+        """
+        Stream an upload to disk, named after its content hash.
+        :param file_storage: Werkzeug FileStorage from request.files.
+        :return: StoredPhoto.
+        """
+        directory = self.directory()
+        extension = file_storage.filename.rsplit('.', 1)[1].lower()
+        digest = hashlib.sha256()
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.upload')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                for chunk in iter(lambda: file_storage.stream.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            content_hash = digest.hexdigest()
+            filename = f'{content_hash}.{extension}'
+            final_path = os.path.join(directory, filename)
+            if os.path.exists(final_path):
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, final_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return StoredPhoto(content_hash, f'{PHOTO_DIRECTORY}/{filename}', self._existing_variants(content_hash))
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def queue(self, stored):
+        """
+        Queue variant rendering for a stored photo on the job queue, in the
+        transaction that adds its Photo rows.
+        :return: True if a job was queued.
+        """
+        if not self.enabled or stored.variants:
+            return False
+        enqueue('render_photo_variants', {'content_hash': stored.content_hash, 'path': stored.path})
+        return True
+
+    def render(self, content_hash, path):
+        """
+        Render the variants of a stored photo on the process pool and record
+        them on its Photo rows, uncommitted.
+        """
+        from app.extensions import db
+        from app.models import Photo
+
+        source_path = os.path.join(self.app.static_folder, path)
+        variants = self._pool().submit(
+            render_variants, source_path, self.directory(), content_hash, self.sizes).result()
+        Photo.query.filter_by(content_hash=content_hash).update(
+            {'variants': json.dumps(variants)}, synchronize_session=False)
+        db.session.info['catalog_changed'] = True
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+@job('render_photo_variants')
+def render_photo_variants_job(content_hash, path):
+    from app.extensions import photo_processor
+
+    photo_processor.render(content_hash, path)
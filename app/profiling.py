@@ -0,0 +1,332 @@
+# app/profiling.py
+
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the statements-per-request histogram buckets
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+# Endpoint label used for requests that matched no route
+UNMATCHED_ENDPOINT = 'unmatched'
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, as Prometheus expects."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestProfile:
+    """What one request did: its statements, SQL and template time."""
+
+    def __init__(self, max_statements):
+        self.started = time.perf_counter()
+        self.max_statements = max_statements
+        self.statements = []
+        self.statement_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.repeats = Counter()
+        self.profiler = None
+
+    def record_statement(self, statement, elapsed):
+        self.statement_count += 1
+        self.sql_time += elapsed
+        self.repeats[statement] += 1
+        if len(self.statements) < self.max_statements:
+            self.statements.append((statement, elapsed))
+
+    def repeated_selects(self, threshold):
+        """
+        Statements run at least `threshold` times in one request, the usual
+        sign of a lazy load inside a loop (N+1).
+        """
+        return {
+            statement: count for statement, count in self.repeats.items()
+            if count >= threshold and statement.lstrip().upper().startswith('SELECT')
+        }
+
+
+class RequestProfiler:
+    """
+    Opt-in per-request instrumentation.
+
+    When PROFILING_ENABLED is set, every request records its wall time, SQL
+    statement count and time (from engine cursor events), template render
+    time and repeated SELECTs that look like N+1 loads. Totals are kept per
+    endpoint in fixed-bucket histograms, so memory stays bounded, and are
+    rendered in the Prometheus text format by `prometheus_text`.
+
+    Requests slower than PROFILING_SLOW_REQUEST_SECONDS are logged with the
+    statements they ran and kept in a short ring buffer. A fraction
+    PROFILING_SAMPLE_RATE of requests also runs under cProfile and keeps the
+    top functions by cumulative time.
+
+    Config keys: PROFILING_ENABLED, PROFILING_SLOW_REQUEST_SECONDS,
+    PROFILING_SAMPLE_RATE, PROFILING_N_PLUS_ONE_THRESHOLD,
+    PROFILING_MAX_STATEMENTS, PROFILING_MAX_ENDPOINTS and PROFILING_LOG_SIZE.
+    """
+
+    def __init__(self, slow_request_seconds=0.5, sample_rate=0.0, n_plus_one_threshold=5,
+                 max_statements=200, max_endpoints=256, log_size=50):
+        self.enabled = False
+        self.slow_request_seconds = slow_request_seconds
+        self.sample_rate = sample_rate
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.max_statements = max_statements
+        self.max_endpoints = max_endpoints
+        self.app = None
+        self._lock = threading.Lock()
+        self._endpoints = OrderedDict()
+        self.slow_requests = deque(maxlen=log_size)
+        self.profiles = deque(maxlen=log_size)
+        self._engine_hooked = False
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.slow_request_seconds = app.config.get('PROFILING_SLOW_REQUEST_SECONDS', self.slow_request_seconds)
+        self.sample_rate = app.config.get('PROFILING_SAMPLE_RATE', self.sample_rate)
+        self.n_plus_one_threshold = app.config.get('PROFILING_N_PLUS_ONE_THRESHOLD', self.n_plus_one_threshold)
+        self.max_statements = app.config.get('PROFILING_MAX_STATEMENTS', self.max_statements)
+        self.max_endpoints = app.config.get('PROFILING_MAX_ENDPOINTS', self.max_endpoints)
+        log_size = app.config.get('PROFILING_LOG_SIZE', self.slow_requests.maxlen)
+        self.slow_requests = deque(maxlen=log_size)
+        self.profiles = deque(maxlen=log_size)
+        self.app = app
+        app.extensions['request_profiler'] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._start)
+        app.teardown_request(self._finish)
+        app.after_request(self._remember_status)
+        self._time_templates(app)
+        if not self._engine_hooked:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._engine_hooked = True
+
+    def _time_templates(self, app):
+        # Jinja calls render() only for the outermost template; includes and
+        # extends run inside it, so this times each full page or fragment once.
+        base = app.jinja_env.template_class
+
+        class TimedTemplate(base):
+            def render(self, *args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return super().render(*args, **kwargs)
+                finally:
+                    profile = _current_profile()
+                    if profile is not None:
+                        profile.template_time += time.perf_counter() - started
+
+        app.jinja_env.template_class = TimedTemplate
+
+    def _start(self):
+        profile = RequestProfile(self.max_statements)
+        if self.sample_rate and random.random() < self.sample_rate:
+            profile.profiler = cProfile.Profile()
+            profile.profiler.enable()
+        g._request_profile = profile
+
+    def _remember_status(self, response):
+        g._request_status = response.status_code
+        return response
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile() is not None:
+            conn.info.setdefault('profiling_started', []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile()
+        started = conn.info.get('profiling_started')
+        if profile is not None and started:
+            profile.record_statement(statement, time.perf_counter() - started.pop())
+
+    def _finish(self, exc=None):
+        profile = g.pop('_request_profile', None)
+        if profile is None:
+            return
+        elapsed = time.perf_counter() - profile.started
+        if profile.profiler is not None:
+            profile.profiler.disable()
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        status = g.pop('_request_status', 500)
+        repeated = profile.repeated_selects(self.n_plus_one_threshold)
+        self._observe(endpoint, elapsed, profile, bool(repeated))
+
+        summary = {
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': status,
+            'duration': round(elapsed, 6),
+            'sql_statements': profile.statement_count,
+            'sql_time': round(profile.sql_time, 6),
+            'template_time': round(profile.template_time, 6),
+        }
+        if repeated:
+            self.app.logger.warning('Possible N+1 on %s: %s', endpoint,
+                                    '; '.join(f'{count}x {statement}' for statement, count in repeated.items()))
+        if elapsed >= self.slow_request_seconds:
+            entry = dict(summary, statements=[
+                {'statement': statement, 'duration': round(duration, 6)} for statement, duration in profile.statements
+            ], repeated=repeated)
+            self.slow_requests.append(entry)
+            self.app.logger.warning('Slow request %s %s took %.3fs with %d statements (%.3fs SQL)',
+                                    request.method, request.path, elapsed,
+                                    profile.statement_count, profile.sql_time)
+        if profile.profiler is not None:
+            output = io.StringIO()
+            pstats.Stats(profile.profiler, stream=output).sort_stats('cumulative').print_stats(25)
+            self.profiles.append(dict(summary, profile=output.getvalue()))
+
+    def _observe(self, endpoint, elapsed, profile, repeated):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                if len(self._endpoints) >= self.max_endpoints:
+                    self._endpoints.popitem(last=False)
+                stats = self._endpoints[endpoint] = {
+                    'duration': Histogram(LATENCY_BUCKETS),
+                    'sql_statements': Histogram(QUERY_COUNT_BUCKETS),
+                    'sql_time': Histogram(LATENCY_BUCKETS),
+                    'template_time': Histogram(LATENCY_BUCKETS),
+                    'n_plus_one': 0,
+                }
+            stats['duration'].observe(elapsed)
+            stats['sql_statements'].observe(profile.statement_count)
+            stats['sql_time'].observe(profile.sql_time)
+            stats['template_time'].observe(profile.template_time)
+            if repeated:
+                stats['n_plus_one'] += 1
+
+    def prometheus_text(self):
+        """
+        Render the per-endpoint histograms in the Prometheus text exposition format.
+        """
+        metrics = (
+            ('duration', 'http_request_duration_seconds', 'Wall time per request.'),
+            ('sql_statements', 'http_request_sql_statements', 'SQL statements executed per request.'),
+            ('sql_time', 'http_request_sql_seconds', 'Time spent in SQL statements per request.'),
+            ('template_time', 'http_request_template_seconds', 'Template render time per request.'),
+        )
+        with self._lock:
+            endpoints = [(endpoint, {
+                name: (list(value.counts), value.sum, value.count) if isinstance(value, Histogram) else value
+                for name, value in stats.items()
+            }) for endpoint, stats in self._endpoints.items()]
+
+        lines = []
+        for key, metric, help_text in metrics:
+            buckets = QUERY_COUNT_BUCKETS if key == 'sql_statements' else LATENCY_BUCKETS
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for endpoint, stats in endpoints:
+                counts, total, count = stats[key]
+                label = _escape_label(endpoint)
+                for bound, bucket_count in zip(buckets, counts):
+                    lines.append(f'{metric}_bucket{{endpoint="{label}",le="{bound:g}"}} {bucket_count}')
+                lines.append(f'{metric}_bucket{{endpoint="{label}",le="+Inf"}} {count}')
+                lines.append(f'{metric}_sum{{endpoint="{label}"}} {total:.6f}')
+                lines.append(f'{metric}_count{{endpoint="{label}"}} {count}')
+        lines.append('# HELP http_request_n_plus_one_total Requests that repeated a SELECT at least the N+1 threshold.')
+        lines.append('# TYPE http_request_n_plus_one_total counter')
+        for endpoint, stats in endpoints:
+            lines.append(f'http_request_n_plus_one_total{{endpoint="{_escape_label(endpoint)}"}} {stats["n_plus_one"]}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+        self.slow_requests.clear()
+        self.profiles.clear()
+
+
+class LazyLoadError(RuntimeError):
+    """Raised by the guard when a template triggers a relationship lazy load."""
+
+
+class LazyLoadGuard:
+    """
+    Test-mode check that templates never lazy-load relationships.
+
+    While a template renders, any ORM statement issued to load a relationship
+    raises LazyLoadError naming the relationship, pointing at the loading
+    profile (see app/loading.py) the route is missing. Enabled by LAZY_LOAD_GUARD, which defaults
+    to the app's TESTING flag.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._listening = False
+
+    def init_app(self, app):
+        self.enabled = app.config.get('LAZY_LOAD_GUARD', app.testing)
+        app.extensions['lazy_load_guard'] = self
+        if not self.enabled:
+            return
+
+        base = app.jinja_env.template_class
+
+        class GuardedTemplate(base):
+            def render(self, *args, **kwargs):
+                rendering = has_request_context()
+                if rendering:
+                    g._rendering = g.get('_rendering', 0) + 1
+                try:
+                    return super().render(*args, **kwargs)
+                finally:
+                    if rendering:
+                        g._rendering -= 1
+
+        app.jinja_env.template_class = GuardedTemplate
+        if not self._listening:
+            event.listen(Session, 'do_orm_execute', self._check)
+            self._listening = True
+
+    def _check(self, orm_execute_state):
+        if not self.enabled or not orm_execute_state.is_relationship_load:
+            return
+        if has_request_context() and g.get('_rendering', 0):
+            path = orm_execute_state.loader_strategy_path
+            relationship = path[-1] if path is not None and len(path) else 'a relationship'
+            raise LazyLoadError(f'Lazy load of {relationship} while rendering a template; '
+                                f'add it to the loading profile of the route.')
+
+
+def _current_profile():
+    if not has_request_context():
+        return None
+    return g.get('_request_profile')
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,119 @@
+# app/query_plans.py
+
+import re
+from datetime import datetime, timedelta
+from enum import Enum
+
+import click
+from flask.cli import with_appcontext
+
+from app.extensions import db
+
+# Tables that availability queries must only reach through a room_id seek.
+INVENTORY_TABLES = ('booking', 'room_night')
+
+
+def _table_access(table):
+    # Any plan line that touches the table, e.g. "SCAN booking" or
+    # "SEARCH TABLE booking USING INDEX ..." on older SQLite versions.
+    return re.compile(rf'\b(SCAN|SEARCH) (TABLE )?{table}\b')
+
+
+def _room_seek(table):
+    # An access that seeks on room_id through an index or the primary key.
+    return re.compile(rf'\bSEARCH (TABLE )?{table} USING ((COVERING )?INDEX \w+|PRIMARY KEY) \(room_id=\?')
+
+def explain_query_plan(query):
+    """
+    Run SQLite's EXPLAIN QUERY PLAN for a query.
+    :param query: SQLAlchemy query or selectable.
+    :return: List of plan detail strings.
+    """
+    statement = getattr(query, 'statement', query)
+    compiled = statement.compile(dialect=db.engine.dialect)
+    params = tuple(
+        value.value if isinstance(value, Enum) else value
+        for value in (compiled.params[name] for name in compiled.positiontup)
+    )
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params)
+    return [row[-1] for row in rows]
+
+
+def unindexed_scans(query, tables=INVENTORY_TABLES):
+    """
+    Return the plan lines that read an inventory table without seeking on room_id.
+    A full scan or a range scan over a date index both count.
+    """
+    checks = [(_table_access(table), _room_seek(table)) for table in tables]
+    return [
+        line for line in explain_query_plan(query)
+        if any(access.search(line) and not seek.search(line) for access, seek in checks)
+    ]
+
+
+def missing_index(query, table, index):
+    """
+    Return the plan lines that read a table without going through the given
+    index; empty when every access to the table uses it.
+    """
+    uses_index = re.compile(rf'\bSEARCH (TABLE )?{table} USING (COVERING )?INDEX {index}\b')
+    return [
+        line for line in explain_query_plan(query)
+        if _table_access(table).search(line) and not uses_index.search(line)
+    ]
+
+
+def check_search_plans():
+    """
+    Check the availability queries against their indexes.
+    :return: Dict mapping the name of each failing query to its scan lines.
+    """
+    from app.search import room_search_query
+
+    start_date = datetime(2000, 1, 1)
+    end_date = start_date + timedelta(days=3)
+    queries = {
+        'search_rooms': room_search_query(start_date, end_date),
+        'search_rooms_by_type': room_search_query(start_date, end_date, room_type='SINGLE'),
+        'search_rooms_by_text': room_search_query(start_date, end_date, search_term='sea view'),
+    }
+    failures = {}
+    for name, query in queries.items():
+        scans = unindexed_scans(query)
+        if scans:
+            failures[name] = scans
+    return failures
+
+
+def check_query_plans():
+    """
+    Check every hot query against the index it depends on: the room search,
+    the availability index load, the hold sweeper and the occupancy calendar.
+    :return: Dict mapping the name of each failing query to its plan lines.
+    """
+    from app.availability import AvailabilityIndex
+    from app.holds import lapsed_holds_query
+    from app.occupancy_calendar import held_nights_query
+
+    day = datetime(2000, 1, 1)
+    checks = {
+        'availability_index': unindexed_scans(AvailabilityIndex.room_bookings_query(1)),
+        'expire_holds': missing_index(lapsed_holds_query(day), 'booking', 'ix_booking_hold_expiry'),
+        'occupancy_calendar': missing_index(held_nights_query(day.date(), day.date() + timedelta(days=31)),
+                                            'room_night', 'ix_room_night_night'),
+    }
+    failures = check_search_plans()
+    failures.update((name, lines) for name, lines in checks.items() if lines)
+    return failures
+
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """Fail if a hot query stops using the index it depends on."""
+    failures = check_query_plans()
+    for name, scans in failures.items():
+        click.echo(f'{name}: ' + '; '.join(scans), err=True)
+    if failures:
+        raise click.ClickException('Query plan without its expected index found.')
+    click.echo('Query plans OK.')
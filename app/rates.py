@@ -0,0 +1,180 @@
+# app/rates.py
+
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# NumPy day numbers count from 1970-01-01, which was a Thursday
+EPOCH_WEEKDAY = 3
+
+# Day numbers standing in for an open-ended season
+OPEN_START = np.iinfo(np.int64).min
+OPEN_END = np.iinfo(np.int64).max
+
+
+def day_number(value):
+    """
+    Days since 1970-01-01 of a date or datetime.
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+
+class CompiledRates:
+    """
+    Rate rules and stay discounts packed into NumPy arrays. Rules are ordered
+    so that each one overrides those before it. Room types are stored as their
+    position in RoomType, and -1 means "any" for room ids and room types.
+    """
+
+    def __init__(self, rules, discounts):
+        from app.models import RoomType
+
+        # Keyed by member and by value, as unflushed rooms may hold the plain string
+        self.type_codes = {key: code for code, room_type in enumerate(RoomType)
+                           for key in (room_type, room_type.value)}
+        rules = sorted(rules, key=lambda rule: (rule.priority, 2 if rule.room_id else 1 if rule.room_type else 0))
+        self.rule_rooms = np.array([rule.room_id or -1 for rule in rules], dtype=np.int64)
+        self.rule_types = np.array([self.type_code(rule.room_type) for rule in rules], dtype=np.int64)
+        self.rule_starts = np.array([day_number(rule.start_day) if rule.start_day else OPEN_START for rule in rules],
+                                    dtype=np.int64)
+        self.rule_ends = np.array([day_number(rule.end_day) if rule.end_day else OPEN_END for rule in rules],
+                                  dtype=np.int64)
+        self.rule_weekdays = np.array([rule.weekdays for rule in rules], dtype=np.int64)
+        self.rule_prices = np.array([np.nan if rule.price is None else rule.price for rule in rules], dtype=np.float64)
+        self.rule_factors = np.array([rule.factor for rule in rules], dtype=np.float64)
+        self.discount_types = np.array([self.type_code(discount.room_type) for discount in discounts], dtype=np.int64)
+        self.discount_nights = np.array([discount.min_nights for discount in discounts], dtype=np.int64)
+        self.discount_percents = np.array([discount.percent for discount in discounts], dtype=np.float64)
+        self.loaded_at = time.monotonic()
+
+    def type_code(self, room_type):
+        return -1 if room_type is None else self.type_codes[room_type]
+
+    def price(self, room_ids, type_codes, list_prices, start_day, nights):
+        """
+        Price one stay in many rooms at once.
+        :param room_ids: Int array of room ids.
+        :param type_codes: Int array of room type codes, see type_code.
+        :param list_prices: Float array of Room.price.
+        :param start_day: Day number of the first night.
+        :return: (rooms x nights array of nightly rates, discount percent per
+            room, total price per room).
+        """
+        days = start_day + np.arange(nights, dtype=np.int64)
+        weekdays = (days + EPOCH_WEEKDAY) % 7
+
+        # Which rules touch which rooms and which nights: rules x rooms and rules x nights
+        room_hits = ((self.rule_rooms[:, None] < 0) | (self.rule_rooms[:, None] == room_ids)) \
+            & ((self.rule_types[:, None] < 0) | (self.rule_types[:, None] == type_codes))
+        night_hits = (self.rule_starts[:, None] <= days) & (days < self.rule_ends[:, None]) \
+            & ((self.rule_weekdays[:, None] >> weekdays) & 1).astype(bool)
+        values = np.where(np.isnan(self.rule_prices)[:, None],
+                          self.rule_factors[:, None] * list_prices, self.rule_prices[:, None])
+
+        rates = np.repeat(list_prices[:, None].astype(np.float64), nights, axis=1)
+        for rule in np.flatnonzero(room_hits.any(axis=1) & night_hits.any(axis=1)):
+            np.copyto(rates, values[rule][:, None], where=room_hits[rule][:, None] & night_hits[rule])
+
+        eligible = (self.discount_nights[:, None] <= nights) \
+            & ((self.discount_types[:, None] < 0) | (self.discount_types[:, None] == type_codes))
+        percents = np.where(eligible, self.discount_percents[:, None], 0.0).max(axis=0, initial=0.0)
+        totals = np.round(rates.sum(axis=1) * (1 - percents / 100), 2)
+        return rates, percents, totals
+
+
+class RateCalendar:
+    """
+    Prices stays from the rate rules and length-of-stay discounts.
+
+    The rules are few and read by every search, so they are compiled once per
+    process (see CompiledRates) and reloaded after `ttl` seconds so changes
+    made by other worker processes are picked up. Commits in this process that
+    touch the rules recompile straight away (see the session events in
+    app/models.py). Every room and night of a search is priced in one pass
+    over arrays; Python only loops over the rules.
+    """
+
+    def __init__(self, ttl=60.0):
+        self.ttl = ttl
+        self._compiled = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('RATE_CALENDAR_TTL', self.ttl)
+        self.invalidate()
+        app.extensions['rate_calendar'] = self
+
+    def invalidate(self):
+        with self._lock:
+            self._compiled = None
+
+    def _load(self):
+        from app.extensions import db
+        from app.models import RateRule, StayDiscount
+
+        rules = db.session.query(
+            RateRule.room_id, RateRule.room_type, RateRule.start_day, RateRule.end_day,
+            RateRule.weekdays, RateRule.price, RateRule.factor, RateRule.priority
+        ).all()
+        discounts = db.session.query(StayDiscount.room_type, StayDiscount.min_nights, StayDiscount.percent).all()
+        return CompiledRates(rules, discounts)
+
+    def _get(self):
+        with self._lock:
+            compiled = self._compiled
+        if compiled is not None and time.monotonic() - compiled.loaded_at < self.ttl:
+            return compiled
+        compiled = self._load()
+        with self._lock:
+            self._compiled = compiled
+        return compiled
+
+    def warm_up(self):
+        """
+        Compile the rules now rather than on the first priced request.
+        """
+        self._get()
+
+    def price(self, rooms, start_date, end_date):
+        """
+        Price a stay in each of the given rooms.
+        :param rooms: Rooms already loaded, e.g. search results; no queries are
+            made for them.
+        :return: Same tuple as CompiledRates.price, one row per room in order.
+        :raises ValueError: If the dates are invalid.
+        """
+        start_day = day_number(start_date)
+        nights = day_number(end_date) - start_day
+        if nights <= 0:
+            raise ValueError('Start date must be before end date')
+        compiled = self._get()
+        room_ids = np.array([room.id or -1 for room in rooms], dtype=np.int64)
+        type_codes = np.array([compiled.type_codes[room.type] for room in rooms], dtype=np.int64)
+        list_prices = np.array([room.price for room in rooms], dtype=np.float64)
+        return compiled.price(room_ids, type_codes, list_prices, start_day, nights)
+
+    def quote_rooms(self, rooms, start_date, end_date):
+        """
+        Total price of a stay for every room of a search result.
+        :return: Dict mapping room id to total price.
+        """
+        if not rooms:
+            return {}
+        _, _, totals = self.price(rooms, start_date, end_date)
+        return {room.id: total for room, total in zip(rooms, totals.tolist())}
+
+    def price_stay(self, room, start_date, end_date):
+        """
+        Price a stay in one room, night by night.
+        :return: Dict with the nightly rates, discount percent and total price.
+        """
+        rates, percents, totals = self.price([room], start_date, end_date)
+        return {
+            'nightly_rates': rates[0].tolist(),
+            'discount_percent': float(percents[0]),
+            'total_price': float(totals[0]),
+        }
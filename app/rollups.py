@@ -0,0 +1,143 @@
+# app/rollups.py
+
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func
+
+from app.extensions import db
+from app.jobs import job
+from app.models import Room, RoomType, Booking, BookingStatus, DailyRollup, apply_rollup
+
+# Rows read per batch when rebuilding the rollups from booking history
+BACKFILL_BATCH_SIZE = 5000
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator else 0.0
+
+
+def kpis(start_day, end_day):
+    """
+    Occupancy, ADR and RevPAR per room type plus counts per booking status for
+    the days in [start_day, end_day), read only from the daily rollups.
+    :return: Dict ready to be rendered or serialised to JSON.
+    """
+    days = max((end_day - start_day).days, 0)
+    rooms_by_type = dict(db.session.query(Room.type, func.count(Room.id)).group_by(Room.type))
+    totals = db.session.query(
+        DailyRollup.room_type, DailyRollup.status,
+        func.sum(DailyRollup.room_nights), func.sum(DailyRollup.revenue), func.sum(DailyRollup.bookings)
+    ).filter(
+        DailyRollup.day >= start_day,
+        DailyRollup.day < end_day
+    ).group_by(DailyRollup.room_type, DailyRollup.status).all()
+
+    by_type = {room_type: {'room_nights': 0, 'revenue': 0.0} for room_type in RoomType}
+    by_status = {status: 0 for status in BookingStatus}
+    for room_type, status, room_nights, revenue, bookings in totals:
+        by_status[status] += bookings or 0
+        if status != BookingStatus.CANCELLED:
+            by_type[room_type]['room_nights'] += room_nights or 0
+            by_type[room_type]['revenue'] += revenue or 0.0
+
+    def summarize(room_nights, revenue, rooms):
+        available = rooms * days
+        return {
+            'rooms': rooms,
+            'room_nights_sold': room_nights,
+            'room_nights_available': available,
+            'revenue': round(revenue, 2),
+            'occupancy_rate': round(_ratio(room_nights, available), 4),
+            'adr': round(_ratio(revenue, room_nights), 2),
+            'revpar': round(_ratio(revenue, available), 2),
+        }
+
+    return {
+        'start_date': start_day.isoformat(),
+        'end_date': end_day.isoformat(),
+        'room_types': {
+            room_type.value: summarize(values['room_nights'], values['revenue'], rooms_by_type.get(room_type, 0))
+            for room_type, values in by_type.items()
+        },
+        'total': summarize(
+            sum(values['room_nights'] for values in by_type.values()),
+            sum(values['revenue'] for values in by_type.values()),
+            sum(rooms_by_type.values())
+        ),
+        'bookings_by_status': {status.value: count for status, count in by_status.items()},
+    }
+
+
+def total_bookings():
+    """
+    Number of bookings ever made, from the rollups.
+    """
+    return int(db.session.query(func.coalesce(func.sum(DailyRollup.bookings), 0)).scalar())
+
+
+@job('apply_rollup')
+def apply_rollup_job(entries):
+    """
+    Apply booking contributions queued by the booking write path (see
+    rollup_entry in app/models.py). Room types are read here, in one query.
+    Runs in the same transaction that marks the job done, so it applies once.
+    """
+    room_types = dict(db.session.query(Room.id, Room.type).filter(Room.id.in_({entry[0] for entry in entries})))
+    delta = {}
+    for room_id, start_date, end_date, status, total_price, sign in entries:
+        contributions = DailyRollup.contributions(
+            room_types.get(room_id), datetime.fromisoformat(start_date), datetime.fromisoformat(end_date),
+            BookingStatus(status), total_price)
+        for key, values in contributions.items():
+            entry = delta.setdefault(key, [0, 0.0, 0])
+            for index, value in enumerate(values):
+                entry[index] += sign * value
+    apply_rollup(db.session.connection(), {key: values for key, values in delta.items() if any(values)}, 1)
+
+
+def backfill(batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Rebuild the rollups from the whole booking history in one transaction.
+    Bookings are streamed in batches; only the per-day totals are held in memory.
+    :return: Number of bookings read.
+    """
+    totals = {}
+    count = 0
+    rows = db.session.query(
+        Room.type, Booking.start_date, Booking.end_date, Booking.status, Booking.total_price
+    ).join(Room, Room.id == Booking.room_id).yield_per(batch_size)
+    for room_type, start_date, end_date, status, total_price in rows:
+        count += 1
+        for key, (room_nights, revenue, bookings) in DailyRollup.contributions(
+                room_type, start_date, end_date, status, total_price).items():
+            entry = totals.setdefault(key, [0, 0.0, 0])
+            entry[0] += room_nights
+            entry[1] += revenue
+            entry[2] += bookings
+
+    DailyRollup.query.delete()
+    db.session.bulk_insert_mappings(DailyRollup, [
+        {'day': day, 'room_type': room_type, 'status': status,
+         'room_nights': room_nights, 'revenue': revenue, 'bookings': bookings}
+        for (day, room_type, status), (room_nights, revenue, bookings) in totals.items()
+    ])
+    db.session.commit()
+    return count
+
+
+def default_window(days=30):
+    """
+    The last `days` days, including today.
+    """
+    end_day = datetime.utcnow().date() + timedelta(days=1)
+    return end_day - timedelta(days=days), end_day
+
+
+@click.command('backfill-rollups')
+@with_appcontext
+def backfill_rollups_command():
+    """Rebuild the daily occupancy and revenue rollups from booking history."""
+    count = backfill()
+    click.echo(f'Rolled up {count} bookings.')
@@ -3,7 +3,11 @@
 from flask import Flask
 import os
 
-def create_app():
+def create_app(config_object='instance.config.DevConfig'):
+    # Time every step until the worker is ready (see app/warmup.py)
+    from app.warmup import StartupReport, bytecode_cache, warm_up
+    startup = StartupReport()
+
     # Setting the paths for templates and static directories
     template_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'templates'))
     static_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static'))
@@ -16,37 +20,85 @@ def create_app():
 
     # Load configuration from instance folder
     # File location: Hotel-Booking-System/instance/config.py
-    app.config.from_object('instance.config.DevConfig')  
+    # (or from the given config object, e.g. the benchmark config)
+    app.config.from_object(config_object)
+
+    # Load compiled templates from disk instead of compiling them in every worker
+    app.jinja_options = {**app.jinja_options, 'bytecode_cache': bytecode_cache(app)}
     
     # Bind app with Flask extensions
     # File location: Hotel-Booking-System/app/extensions.py
-    from app.extensions import db, migrate, login_manager, bcrypt
+    from app.extensions import db, migrate, login_manager, password_hasher, user_cache, photo_processor, catalog_cache, availability_index, rate_calendar, hold_sweeper, job_runner, request_profiler, lazy_load_guard
     db.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
-    bcrypt.init_app(app)
+    password_hasher.init_app(app)
+    user_cache.init_app(app)
+    photo_processor.init_app(app)
+    catalog_cache.init_app(app)
+    availability_index.init_app(app)
+    rate_calendar.init_app(app)
+    hold_sweeper.init_app(app)
+    job_runner.init_app(app)
+    request_profiler.init_app(app)
+    lazy_load_guard.init_app(app)
     login_manager.login_view = 'auth.login'
+    startup.mark('extensions')
 
     # Import blueprints
     # File locations: 
     # Hotel-Booking-System/app/routes/admin.py
     # Hotel-Booking-System/app/routes/auth.py
     # Hotel-Booking-System/app/routes/customers.py
+    # Hotel-Booking-System/app/routes/api.py
     from .admin import admin
     from .auth import auth
     from .customers import customers
+    from .api import api
     
     # Register blueprints
     app.register_blueprint(admin, url_prefix='/admin')
     app.register_blueprint(auth, url_prefix='/auth')
     app.register_blueprint(customers, url_prefix='/')
+    app.register_blueprint(api, url_prefix='/api/v1')
+    startup.mark('blueprints')
 
     # Import models and User Loader function for Flask-Login
     # File location: Hotel-Booking-System/app/models.py
     from app.models import User
 
+    # Register CLI commands
+    # File locations:
+    # Hotel-Booking-System/app/query_plans.py
+    # Hotel-Booking-System/app/rollups.py
+    from app.query_plans import check_query_plans_command
+    from app.rollups import backfill_rollups_command
+    from app.bulk import import_rooms_command
+    from app.holds import expire_holds_command
+    from app.jobs import run_jobs_command, retry_dead_jobs_command
+    from app.warmup import warm_up_command
+    app.cli.add_command(check_query_plans_command)
+    app.cli.add_command(backfill_rollups_command)
+    app.cli.add_command(import_rooms_command)
+    app.cli.add_command(expire_holds_command)
+    app.cli.add_command(run_jobs_command)
+    app.cli.add_command(retry_dead_jobs_command)
+    app.cli.add_command(warm_up_command)
+    startup.mark('commands')
+
+    # Serve a cached snapshot of the user instead of querying on every request.
+    # Deactivated (archived, or queued for deletion) users are logged out.
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        user = user_cache.get(user_id, User.query.get)
+        return user if user is not None and user.is_active else None
+
+    # Warm up before the worker takes traffic, so its first requests run at
+    # steady-state speed
+    if app.config.get('WARM_UP', True):
+        warm_up(app, startup)
+    startup.finish()
+    app.extensions['startup'] = startup
+    app.logger.info(startup.summary())
 
     return app
@@ -1,19 +1,43 @@
 # app/routes/admin.py
 
 # Importing required modules and classes.
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
-from app.models import Room, User, Amenity, Booking, Photo
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, Response, stream_with_context, abort
+from app.models import Room, User, Amenity, Photo, BookingStatus, RoomType, RateRule, StayDiscount
 from functools import wraps
 from flask_login import login_required, current_user
-from app.extensions import db
+from app.extensions import db, password_hasher, user_cache, photo_processor, catalog_cache, request_profiler, job_runner
 from sqlalchemy.exc import IntegrityError
-from werkzeug.utils import secure_filename
 from flask import jsonify
-import os
+from app.pagination import paginate_request
+from app.loading import with_profile
+from app.database import reads_from_replica
+from app.holds import releases_lapsed_holds
+from app.rollups import kpis, total_bookings, default_window
+from app.occupancy_calendar import availability_calendar, MAX_CALENDAR_DAYS
+from app.exports import EXPORT_FORMATS, BOOKING_COLUMNS, USER_COLUMNS, booking_export_query, user_export_query
+from app.bulk import IMPORT_FORMATS, import_rooms, remove_users
+from app.jobs import enqueue
+from datetime import datetime
 
 # Blueprint for the admin related routes.
 admin = Blueprint('admin', __name__)
 
+# Keyset sort options for the admin listings. Each ends in the primary key
+# and is backed by an index on the leading column.
+USER_SORTS = {
+    'id': (User.id,),
+    'username': (User.username, User.id),
+    'registered': (User.date_registered, User.id),
+}
+ROOM_SORTS = {
+    'id': (Room.id,),
+    'room_number': (Room.room_number, Room.id),
+    'price': (Room.price, Room.id),
+}
+
+# Date format accepted by the export filters.
+EXPORT_DATE_FORMAT = '%Y-%m-%d'
+
 # Allowed file extensions for room photos.
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
@@ -57,32 +81,92 @@ def bulk_delete_users():
     if not user_ids:
         flash('No users selected for deletion.', 'warning')
         return redirect(url_for('admin.manage_users'))
-    User.query.filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+    archive = request.form.get('action') == 'archive'
+    try:
+        user_ids = sorted({int(user_id) for user_id in user_ids})
+    except ValueError:
+        flash('Invalid user selection.', 'danger')
+        return redirect(url_for('admin.manage_users'))
+    # Their bookings may take a while to release; run it on the job queue.
+    # Deactivate the users now so they are logged out before the job runs.
+    users = User.__table__
+    db.session.execute(users.update().where(users.c.id.in_(user_ids)).values(is_active=False))
+    enqueue('remove_users', {'user_ids': user_ids, 'archive': archive})
     db.session.commit()
-    flash(f'{len(user_ids)} users deleted successfully!', 'success')
+    user_cache.invalidate(*user_ids)
+    flash(f'{len(user_ids)} users queued for {"archiving" if archive else "deletion"}.', 'success')
     return redirect(url_for('admin.manage_users'))
 
+# Route to import rooms in bulk from a CSV or JSON file.
+@admin.route('/import-rooms', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_rooms_view():
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Choose a file to import.', 'warning')
+            return redirect(url_for('admin.import_rooms_view'))
+        fmt = request.form.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+        if fmt not in IMPORT_FORMATS:
+            flash('Rooms can be imported from CSV or JSON files only.', 'danger')
+            return redirect(url_for('admin.import_rooms_view'))
+        result = import_rooms(upload.stream, fmt)
+        flash(f'Created {result.created} rooms, skipped {result.skipped} existing, '
+              f'{result.failed} invalid.', 'warning' if result.failed else 'success')
+        return render_template('admin/import_rooms.html', formats=IMPORT_FORMATS, errors=result.errors)
+    return render_template('admin/import_rooms.html', formats=IMPORT_FORMATS, errors=[])
+
 # Admin dashboard main route.
 @admin.route('/dashboard')
 @login_required
 @admin_required
 def admin_dashboard():
-    return render_template('admin/admin_dashboard.html')
+    start_day, end_day = default_window()
+    return render_template(
+        'admin/admin_dashboard.html',
+        users_count=User.query.count(),
+        rooms_count=Room.query.count(),
+        bookings_count=total_bookings(),
+        kpis=kpis(start_day, end_day)
+    )
+
+# Route to read occupancy and revenue KPIs for a date range as JSON.
+@admin.route('/kpis')
+@reads_from_replica
+@login_required
+@admin_required
+def dashboard_kpis():
+    start_day, end_day = default_window()
+    start_day = (export_date_arg('start_date') or datetime.combine(start_day, datetime.min.time())).date()
+    end_day = (export_date_arg('end_date') or datetime.combine(end_day, datetime.min.time())).date()
+    if end_day <= start_day:
+        abort(400)
+    return jsonify(kpis(start_day, end_day))
 
 # Route to list all rooms.
 @admin.route('/list-rooms')
+@reads_from_replica
 @admin_required
 def list_rooms_for_admin():
-    rooms = Room.query.all()
-    return render_template('admin/manage_rooms.html', rooms=rooms)
+    def render_rooms():
+        page = paginate_request(with_profile(Room.query, 'room_row'), ROOM_SORTS, request.args)
+        statuses = Room.occupancy_snapshot(page.items)
+        return render_template('admin/_room_table.html', rooms=page.items, page=page, statuses=statuses)
+
+    # Statuses change at midnight as well as on booking writes, so key on the day too
+    key = catalog_cache.make_key(f'admin_rooms:{datetime.utcnow().date().isoformat()}', request.args)
+    rooms_html = catalog_cache.get_or_set(key, render_rooms)
+    return render_template('admin/manage_rooms.html', rooms_html=rooms_html)
 
 # Route to manage all users.
 @admin.route('/manage-users')
+@reads_from_replica
 @login_required
 @admin_required
 def manage_users():
-    users = User.query.all()
-    return render_template('admin/manage_users.html', users=users)
+    page = paginate_request(with_profile(User.query, 'user_row'), USER_SORTS, request.args)
+    return render_template('admin/manage_users.html', users=page.items, page=page)
 
 # Route to view a specific room.
 @admin.route('/view-room/<int:room_id>', methods=['GET'])
@@ -108,6 +192,7 @@ def user_detail(user_id):
         user.email = request.form['email']
         user.is_admin = 'admin' in request.form
         db.session.commit()
+        user_cache.invalidate(user_id)
         flash('User details updated!', 'success')
         return redirect(url_for('admin.user_detail', user_id=user_id))
     return render_template('admin/manage_users.html', user=user)
@@ -117,12 +202,9 @@ def user_detail(user_id):
 @login_required
 @admin_required
 def delete_user(user_id):
-    user = User.query.get(user_id)
-    if not user:
+    if not remove_users([user_id]):
         flash('User not found.', 'danger')
         return redirect(url_for('admin.manage_users'))
-    db.session.delete(user)
-    db.session.commit()
     flash('User deleted!', 'success')
     return redirect(url_for('admin.manage_users'))
 
@@ -132,10 +214,10 @@ def delete_user(user_id):
 @login_required
 @admin_required
 def room_form(room_id):
-    room = Room.query.get(room_id) if room_id else None
+    room = with_profile(Room.query, 'room_detail').get(room_id) if room_id else None
     
-    # Fetch all available amenities
-    all_amenities = Amenity.query.all()
+    # Fetch the amenities a room can have; ids past MAX_ID do not fit in Room.amenity_mask
+    all_amenities = Amenity.query.filter(Amenity.id <= Amenity.MAX_ID).all()
 
     if request.method == 'POST':
         if not room:
@@ -148,21 +230,33 @@ def room_form(room_id):
         room.price = float(request.form['room_price'])
         
         # Updating the amenities based on their IDs
-        selected_amenities_ids = [int(id) for id in request.form.getlist('amenities')]
+        try:
+            selected_amenities_ids = request.form.getlist('amenities', type=int)
+            Amenity.mask_for(selected_amenities_ids)  # rejects ids that cannot be in a room's amenity mask
+        except ValueError as e:
+            db.session.rollback()
+            flash(f'Could not save the room: {e}', 'danger')
+            return redirect(request.url)
         room.amenities = Amenity.query.filter(Amenity.id.in_(selected_amenities_ids)).all()
 
+        stored_photos = []
         if 'photos' in request.files:
+            known_hashes = {photo.content_hash for photo in room.photos}
             for photo in request.files.getlist('photos'):
                 if photo and allowed_file(photo.filename):
-                    filename = secure_filename(photo.filename)
-                    photo_path_full = os.path.join(current_app.static_folder, 'room_photos', filename)
-                    # Save the photo to the static folder
-                    photo.save(photo_path_full)
+                    # Stream the photo to the static folder, named after its content hash
+                    stored = photo_processor.save(photo)
+                    if stored.content_hash in known_hashes:
+                        continue
+                    known_hashes.add(stored.content_hash)
                     # Only save the relative path to the database
-                    relative_photo_path = os.path.join('room_photos', filename)
-                    new_photo = Photo(path=relative_photo_path)
+                    new_photo = Photo(path=stored.path, content_hash=stored.content_hash, variants=stored.variants_json())
                     room.photos.append(new_photo)
+                    stored_photos.append(stored)
 
+        # Resizing runs on the job queue, enqueued with the Photo rows
+        for stored in stored_photos:
+            photo_processor.queue(stored)
         db.session.commit()
         flash(f"Room {'edited' if room_id else 'added'} successfully!", 'success')
         return redirect(url_for('admin.admin_dashboard'))
@@ -170,4 +264,188 @@ def room_form(room_id):
     return render_template('admin/room_form.html', room=room, amenities=all_amenities)
 
 
+# Helper to read an optional YYYY-MM-DD date from the rate forms.
+def rate_date_field(name):
+    value = request.form.get(name, '').strip()
+    return datetime.strptime(value, EXPORT_DATE_FORMAT).date() if value else None
+
+# Helper to read an optional room type from the rate forms.
+def rate_room_type_field():
+    value = request.form.get('room_type') or None
+    if value and value not in RoomType.__members__:
+        raise ValueError('Unknown room type.')
+    return RoomType[value] if value else None
+
+# Route to list and add nightly rate rules and length-of-stay discounts.
+@admin.route('/rates', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def rates():
+    if request.method == 'POST':
+        try:
+            if request.form.get('kind') == 'discount':
+                percent = float(request.form['percent'])
+                min_nights = int(request.form['min_nights'])
+                if not 0 < percent < 100 or min_nights < 1:
+                    raise ValueError('Discount must be between 0 and 100 percent, from one night up.')
+                db.session.add(StayDiscount(room_type=rate_room_type_field(), percent=percent, min_nights=min_nights))
+            else:
+                rule = RateRule(
+                    name=request.form['name'].strip(),
+                    room_type=rate_room_type_field(),
+                    start_day=rate_date_field('start_day'),
+                    end_day=rate_date_field('end_day'),
+                    weekdays=RateRule.weekday_mask(request.form.getlist('weekdays')),
+                    price=float(request.form['price']) if request.form.get('price') else None,
+                    factor=float(request.form.get('factor') or 1.0),
+                    priority=int(request.form.get('priority') or 0),
+                )
+                room_number = request.form.get('room_number', '').strip()
+                if room_number:
+                    room = Room.query.filter_by(room_number=room_number).first()
+                    if not room:
+                        raise ValueError(f'Room {room_number} not found.')
+                    rule.room_id = room.id
+                if not rule.name or not rule.weekdays:
+                    raise ValueError('A rule needs a name and at least one weekday.')
+                if (rule.price is not None and rule.price < 0) or rule.factor < 0:
+                    raise ValueError('Rates cannot be negative.')
+                if rule.start_day and rule.end_day and rule.start_day >= rule.end_day:
+                    raise ValueError('The season must end after it starts.')
+                db.session.add(rule)
+            db.session.commit()
+            flash('Rate saved.', 'success')
+        except (KeyError, ValueError) as e:
+            db.session.rollback()
+            flash(f'Could not save the rate: {e}', 'danger')
+        return redirect(url_for('admin.rates'))
+
+    rules = RateRule.query.order_by(RateRule.priority.desc(), RateRule.id).all()
+    room_numbers = dict(db.session.query(Room.id, Room.room_number).filter(
+        Room.id.in_([rule.room_id for rule in rules if rule.room_id])))
+    discounts = StayDiscount.query.order_by(StayDiscount.min_nights).all()
+    return render_template('admin/rates.html', rules=rules, discounts=discounts, room_numbers=room_numbers,
+                           room_types=list(RoomType))
+
+# Route to delete a rate rule or a stay discount.
+@admin.route('/rates/<kind>/<int:rate_id>/delete', methods=['POST'])
+@login_required
+@admin_required
+def delete_rate(kind, rate_id):
+    model = {'rule': RateRule, 'discount': StayDiscount}.get(kind)
+    if model is None:
+        abort(404)
+    db.session.delete(model.query.get_or_404(rate_id))
+    db.session.commit()
+    flash('Rate deleted.', 'success')
+    return redirect(url_for('admin.rates'))
+
+# Helper to read an optional date filter from the query string.
+def export_date_arg(name):
+    value = request.args.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, EXPORT_DATE_FORMAT)
+    except ValueError:
+        abort(400)
+
+# Helper to build a streamed download response for an export.
+def export_response(name, fmt, query, columns):
+    generator, mimetype = EXPORT_FORMATS[fmt]
+    response = Response(stream_with_context(generator(query, columns)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    return response
 
+# Route to stream bookings as CSV or NDJSON, filtered by date range and status.
+@admin.route('/export/bookings.<fmt>')
+@reads_from_replica
+@login_required
+@admin_required
+def export_bookings(fmt):
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    try:
+        statuses = [BookingStatus(status.upper()) for status in request.args.getlist('status')]
+    except ValueError:
+        abort(400)
+    query = booking_export_query(export_date_arg('start_date'), export_date_arg('end_date'), statuses)
+    return export_response('bookings', fmt, query, BOOKING_COLUMNS)
+
+# Route to stream users as CSV or NDJSON, filtered by registration date.
+@admin.route('/export/users.<fmt>')
+@reads_from_replica
+@login_required
+@admin_required
+def export_users(fmt):
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    query = user_export_query(export_date_arg('start_date'), export_date_arg('end_date'))
+    return export_response('users', fmt, query, USER_COLUMNS)
+
+# Route to report password hashing pool metrics.
+@admin.route('/metrics/password-hashing')
+@login_required
+@admin_required
+def password_hashing_metrics():
+    return jsonify(password_hasher.metrics())
+
+# Route to report room catalog cache metrics.
+@admin.route('/metrics/catalog-cache')
+@login_required
+@admin_required
+def catalog_cache_metrics():
+    return jsonify(catalog_cache.metrics())
+
+# Route to report background job queue metrics.
+@admin.route('/metrics/jobs')
+@login_required
+@admin_required
+def job_metrics():
+    return jsonify(job_runner.metrics())
+
+# Route to report how long this worker took to start and warm up.
+@admin.route('/metrics/startup')
+@login_required
+@admin_required
+def startup_metrics():
+    return jsonify(current_app.extensions['startup'].as_dict())
+
+# Route to expose per-endpoint request metrics in Prometheus text format.
+@admin.route('/metrics')
+@login_required
+@admin_required
+def request_metrics():
+    if not request_profiler.enabled:
+        abort(404)
+    return Response(request_profiler.prometheus_text(), mimetype='text/plain; version=0.0.4')
+
+# Route to list recent slow requests and sampled cProfile reports.
+@admin.route('/metrics/slow-requests')
+@login_required
+@admin_required
+def slow_requests():
+    if not request_profiler.enabled:
+        abort(404)
+    return jsonify({
+        'threshold': request_profiler.slow_request_seconds,
+        'slow_requests': list(request_profiler.slow_requests),
+        'profiles': list(request_profiler.profiles),
+    })
+
+# Route to return a rooms x nights occupancy grid for the front desk.
+@admin.route('/calendar')
+@releases_lapsed_holds
+@reads_from_replica
+@login_required
+@admin_required
+def availability_calendar_view():
+    start_date = export_date_arg('start_date') or datetime.utcnow()
+    days = request.args.get('days', 31, type=int)
+    room_type = request.args.get('room_type')
+    encoding = request.args.get('encoding', 'bitmap')
+    if not 1 <= days <= MAX_CALENDAR_DAYS or encoding not in ('bitmap', 'rows'):
+        abort(400)
+    if room_type and room_type not in RoomType.__members__:
+        abort(400)
+    return jsonify(availability_calendar(start_date.date(), days, room_type, encoding))
@@ -0,0 +1,159 @@
+# app/routes/api.py
+
+# Versioned JSON API for the mobile app and channel-manager integrations.
+# Every listing goes through a serializer's load options, so each endpoint
+# runs a fixed number of queries.
+from datetime import datetime
+from functools import wraps
+
+from flask import Blueprint, jsonify, request, abort
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+
+from app.models import Room, Booking, RoomType, Amenity
+from app.search import room_search_query
+from app.booking_service import create_booking, confirm_booking, quote, BookingConflictError, HoldExpiredError
+from app.pagination import keyset_paginate, InvalidCursor
+from app.serializers import RoomSerializer, BookingSerializer
+from app.database import reads_from_replica
+from app.holds import releases_lapsed_holds
+from app.extensions import catalog_cache, rate_calendar
+from app.routes.customers import BOOKING_SORTS, DATE_FORMAT
+
+api = Blueprint('api', __name__)
+
+# Search page size: default and upper bound.
+DEFAULT_SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 200
+
+# Errors are JSON too, with the HTTP status as the response code.
+@api.errorhandler(HTTPException)
+def handle_http_error(e):
+    return jsonify({'error': e.description}), e.code
+
+# Decorator for endpoints that need a signed-in customer. Answers 401
+# instead of redirecting to the login page.
+def api_login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated:
+            abort(401, description='Authentication required.')
+        return f(*args, **kwargs)
+    return decorated_function
+
+# Helper to read a YYYY-MM-DD date from the query string or JSON body.
+def date_param(source, name, required=False):
+    value = (source.get(name) or '').strip()
+    if not value:
+        if required:
+            abort(400, description=f'{name} is required.')
+        return None
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        abort(400, description=f'{name} must be a date in YYYY-MM-DD format.')
+
+# Route to search available rooms by dates, type, text and amenities.
+@api.route('/rooms')
+@releases_lapsed_holds
+@reads_from_replica
+def search_rooms():
+    start_date = date_param(request.args, 'start_date')
+    end_date = date_param(request.args, 'end_date')
+    if (start_date is None) != (end_date is None) or (start_date and start_date >= end_date):
+        abort(400, description='start_date and end_date must both be given, start before end.')
+    room_type = request.args.get('room_type')
+    if room_type and room_type not in RoomType.__members__:
+        abort(400, description='Unknown room_type.')
+    search_term = request.args.get('q', '').strip()
+    limit = request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if not 1 <= limit <= MAX_SEARCH_LIMIT or offset < 0:
+        abort(400, description=f'limit must be between 1 and {MAX_SEARCH_LIMIT}.')
+    try:
+        amenity_ids = sorted({int(value) for value in request.args.getlist('amenity')})
+        Amenity.mask_for(amenity_ids)
+    except ValueError:
+        abort(400, description='Unknown amenity.')
+
+    def search():
+        query = room_search_query(start_date, end_date, room_type, search_term, amenity_ids)
+        if not search_term:
+            query = query.order_by(Room.id)
+        rooms = RoomSerializer.apply(query).limit(limit + 1).offset(offset).all()
+        has_more = len(rooms) > limit
+        rooms = rooms[:limit]
+        payload = RoomSerializer.dump_many(rooms)
+        if start_date:
+            totals = rate_calendar.quote_rooms(rooms, start_date, end_date)
+            for room, item in zip(rooms, payload):
+                item['total_price'] = totals[room.id]
+        return {
+            'rooms': payload,
+            'limit': limit,
+            'offset': offset,
+            'has_more': has_more,
+        }
+
+    return jsonify(catalog_cache.get_or_set(catalog_cache.make_key('api_rooms', request.args), search))
+
+# Route to price a stay in a room without booking it.
+@api.route('/rooms/<int:room_id>/quote')
+@releases_lapsed_holds
+@reads_from_replica
+def room_quote(room_id):
+    room = Room.query.get_or_404(room_id, description='Room not found.')
+    start_date = date_param(request.args, 'start_date', required=True)
+    end_date = date_param(request.args, 'end_date', required=True)
+    try:
+        return jsonify(quote(room, start_date, end_date))
+    except ValueError as e:
+        abort(400, description=str(e))
+
+# Route to book a room for the signed-in customer.
+@api.route('/bookings', methods=['POST'])
+@api_login_required
+def create_booking_view():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('room_id'), int):
+        abort(400, description='Expected a JSON object with room_id, start_date and end_date.')
+    start_date = date_param(payload, 'start_date', required=True)
+    end_date = date_param(payload, 'end_date', required=True)
+    try:
+        booking = create_booking(current_user.id, payload['room_id'], start_date, end_date)
+    except BookingConflictError as e:
+        abort(409, description=str(e))
+    except ValueError as e:
+        abort(400, description=str(e))
+    booking = BookingSerializer.apply(Booking.query).filter(Booking.id == booking.id).one()
+    return jsonify(BookingSerializer.dump(booking)), 201
+
+# Route to confirm one of the signed-in customer's pending bookings.
+@api.route('/bookings/<int:booking_id>/confirm', methods=['POST'])
+@api_login_required
+def confirm_booking_endpoint(booking_id):
+    Booking.query.filter_by(id=booking_id, user_id=current_user.id).first_or_404(description='Booking not found.')
+    try:
+        confirm_booking(booking_id, current_user.id)
+    except HoldExpiredError as e:
+        abort(410, description=str(e))
+    except ValueError as e:
+        abort(409, description=str(e))
+    booking = BookingSerializer.apply(Booking.query).filter(Booking.id == booking_id).one()
+    return jsonify(BookingSerializer.dump(booking))
+
+# Route to list the signed-in customer's bookings, keyset paginated.
+@api.route('/bookings')
+@api_login_required
+def list_bookings():
+    query = BookingSerializer.apply(Booking.query.filter_by(user_id=current_user.id))
+    try:
+        page = keyset_paginate(query, BOOKING_SORTS, request.args.get('sort'), request.args.get('cursor'),
+                               request.args.get('per_page', type=int))
+    except InvalidCursor as e:
+        abort(400, description=str(e))
+    return jsonify({
+        'bookings': BookingSerializer.dump_many(page.items),
+        'sort': page.sort,
+        'next_cursor': page.next_cursor,
+    })
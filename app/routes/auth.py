@@ -21,6 +21,8 @@ def login():
             
             user = User.query.filter_by(email=email).first()
             if user and user.check_password(password):
+                if user.rehash_password_if_needed(password):
+                    db.session.commit()
                 login_user(user)
                 if user.is_admin:
                     return redirect(url_for('admin.admin_dashboard'))
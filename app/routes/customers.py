@@ -1,17 +1,21 @@
 # File: Hotel-Booking-System/app/routes/customers.py
 # Standard library imports
-import os
 from datetime import datetime
 from functools import wraps
 
 # Third-party library imports
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app as app
-from sqlalchemy import or_, and_
+from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 
 # Local application/library specific imports
-from app.models import Room, Booking
-from app.extensions import db
+from app.models import Room, Booking, Amenity
+from app.search import room_search_query
+from app.booking_service import create_booking, confirm_booking, hold_duration
+from app.pagination import paginate_request
+from app.loading import with_profile
+from app.database import reads_from_replica
+from app.holds import releases_lapsed_holds
+from app.extensions import db, catalog_cache, rate_calendar
 
 customers = Blueprint('customers', __name__)
 
@@ -31,19 +35,37 @@ def role_required(is_admin: bool):
 customer_required = role_required(is_admin=False)
 admin_required = role_required(is_admin=True)
 
+# Keyset sort options for the customer listings, each backed by an index.
+ROOM_SORTS = {
+    'id': (Room.id,),
+    'price': (Room.price, Room.id),
+}
+BOOKING_SORTS = {
+    'start_date': (Booking.start_date, Booking.id),
+    'id': (Booking.id,),
+}
+
 @customers.route('/')
+@reads_from_replica
 def index():
-    return render_template('customers/index.html')
+    return render_template('customers/index.html', amenities=Amenity.query.order_by(Amenity.name).all())
 
 @customers.route('/list-rooms')
+@reads_from_replica
 @login_required
 @customer_required
 def list_rooms():
-    rooms = Room.query.all()
-    if not rooms:  # Check if the rooms list is empty
+    def render_rooms():
+        page = paginate_request(with_profile(Room.query, 'room_row'), ROOM_SORTS, request.args)
+        if not page.items and not request.args.get('cursor'):
+            return ''
+        return render_template('customers/_room_table.html', rooms=page.items, page=page)
+
+    rooms_html = catalog_cache.get_or_set(catalog_cache.make_key('list_rooms', request.args), render_rooms)
+    if not rooms_html:  # Check if the rooms list is empty
         flash('Currently, there are no rooms available for booking.', 'info')
         return redirect(url_for('customers.index'))
-    return render_template('customers/book_room.html', rooms=rooms)
+    return render_template('customers/list.rooms.html', rooms_html=rooms_html)
 
 
 @customers.route('/book-room/<int:room_id>', methods=['GET', 'POST'])
@@ -59,20 +81,13 @@ def book_room(room_id):
             start_date = datetime.strptime(start_date_str, DATE_FORMAT)
             end_date = datetime.strptime(end_date_str, DATE_FORMAT)
 
-            overlapping_bookings = Booking.query.filter(
-                Booking.room_id == room_id,
-                Booking.start_date < end_date,
-                Booking.end_date > start_date
-            ).count()
-
-            if overlapping_bookings > 0:
-                raise ValueError('Room is already booked during the specified dates.')
-
-            booking = Booking(user_id=current_user.id, room_id=room_id, start_date=start_date, end_date=end_date)
-            booking.calculate_total_price()
-            db.session.add(booking)
-            db.session.commit()
-            flash('Room booked successfully!', 'success')
+            create_booking(current_user.id, room_id, start_date, end_date)
+            hold = hold_duration()
+            if hold:
+                flash(f'Room held for {int(hold.total_seconds() // 60)} minutes. '
+                      'Confirm the booking from your bookings before then to keep it.', 'success')
+            else:
+                flash('Room booked successfully!', 'success')
             return redirect(url_for('customers.dashboard'))
         except ValueError as e:
             flash(str(e), 'danger')
@@ -86,6 +101,8 @@ def book_room(room_id):
 
 
 @customers.route('/search_rooms', methods=['POST'])
+@releases_lapsed_holds
+@reads_from_replica
 def search_rooms():
     room_type = request.form.get('roomType')
     start_date_str = request.form.get('start_date', '').strip()
@@ -95,44 +112,53 @@ def search_rooms():
     try:
         start_date = datetime.strptime(start_date_str, DATE_FORMAT) if start_date_str else None
         end_date = datetime.strptime(end_date_str, DATE_FORMAT) if end_date_str else None
+        amenity_ids = sorted({int(amenity_id) for amenity_id in request.form.getlist('amenities')})
+        Amenity.mask_for(amenity_ids)  # rejects ids that cannot be in a room's amenity mask
     except ValueError:
-        flash('Invalid date format. Please select valid dates.', 'danger')
+        flash('Invalid search. Please check the dates and amenities.', 'danger')
         return redirect(url_for('customers.index'))
 
-    query = Room.query
-
-    if search_term:
-        query = query.filter(Room.name.ilike(f'%{search_term}%'))
-
-    if start_date and end_date:
-        subquery = Booking.query.filter(
-            and_(
-                Booking.start_date < end_date,
-                Booking.end_date > start_date
-            )
-        ).with_entities(Booking.room_id).subquery()
-
-        query = query.filter(~Room.id.in_(subquery))
+    def render_results():
+        rooms = with_profile(room_search_query(start_date, end_date, room_type, search_term, amenity_ids), 'room_card').all()
+        # Every card's total for the requested stay, priced in one pass
+        priced = start_date and end_date and start_date < end_date
+        totals = rate_calendar.quote_rooms(rooms, start_date, end_date) if priced else {}
+        return render_template('customers/_room_cards.html', rooms=rooms, totals=totals,
+                               nights=(end_date - start_date).days if priced else None)
 
-    if room_type:
-        query = query.filter(Room.type == room_type)
+    rooms_html = catalog_cache.get_or_set(catalog_cache.make_key('search_rooms', {
+        'type': room_type or '', 'start': start_date_str, 'end': end_date_str, 'q': search_term.lower(),
+        'amenities': ','.join(map(str, amenity_ids))
+    }), render_results)
 
-    rooms = query.all()
-
-    return render_template('customers/index.html', rooms=rooms)
+    amenities = Amenity.query.order_by(Amenity.name).all()
+    return render_template('customers/index.html', rooms_html=rooms_html, amenities=amenities, selected_amenities=amenity_ids)
 
 @customers.route('/view-all-bookings')
 @login_required
 @customer_required
 def view_all_bookings():
     # logic to fetch and return all bookings for the user
-    bookings = Booking.query.filter_by(user_id=current_user.id).all()
-    return render_template('customers/view_all_bookings.html', bookings=bookings)
+    query = with_profile(Booking.query.filter_by(user_id=current_user.id), 'booking_row')
+    page = paginate_request(query, BOOKING_SORTS, request.args)
+    return render_template('customers/view_all_bookings.html', bookings=page.items, page=page)
+
+# Route to confirm a pending booking before its hold lapses.
+@customers.route('/booking/<int:booking_id>/confirm', methods=['POST'])
+@login_required
+@customer_required
+def confirm_booking_view(booking_id):
+    try:
+        confirm_booking(booking_id, current_user.id)
+        flash('Booking confirmed!', 'success')
+    except ValueError as e:
+        flash(str(e), 'danger')
+    return redirect(request.referrer or url_for('customers.view_all_bookings'))
 
 @customers.route('/dashboard')
 @login_required
 @customer_required
 def dashboard():
-    bookings = Booking.query.filter_by(user_id=current_user.id).all()
+    bookings = with_profile(Booking.query.filter_by(user_id=current_user.id), 'booking_row').all()
     return render_template('customers/user_dashboard.html', bookings=bookings)
 
@@ -0,0 +1,90 @@
+# app/search.py
+
+import re
+
+from sqlalchemy import and_, or_, table, column
+
+from app.extensions import db
+from app.models import Room, RoomNight, Amenity
+
+# The FTS5 index over rooms (see ROOM_SEARCH_DDL in app/models.py). Declared
+# as a lightweight table so create_all never tries to build it as a plain table.
+room_search = table(
+    'room_search',
+    column('rowid'), column('room_number'), column('description'), column('amenities'),
+    column('room_search'), column('rank'),
+)
+
+# Words in a search term; everything else is dropped so user input can never
+# reach FTS5 query syntax.
+SEARCH_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def match_expression(search_term):
+    """
+    Turn free text into an FTS5 query: every word must match, each as a prefix.
+    :return: The MATCH string, or None if the term has no words.
+    """
+    tokens = SEARCH_TOKEN.findall(search_term)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def claimed_nights(start_date, end_date):
+    """
+    Correlated subquery for the nights of a stay already held in a room.
+    Seeks straight into the room_night primary key on (room_id, night).
+    """
+    return RoomNight.query.filter(
+        and_(
+            RoomNight.room_id == Room.id,
+            RoomNight.night >= start_date.date(),
+            RoomNight.night < end_date.date()
+        )
+    ).with_entities(RoomNight.night)
+
+
+def room_search_query(start_date=None, end_date=None, room_type=None, search_term=None, amenity_ids=None):
+    """
+    Build the room search query used by customers.search_rooms.
+    A search term is matched against the room_search FTS5 index and results
+    are ordered by relevance (bm25). Required amenities are one bitwise test
+    on Room.amenity_mask however many are asked for. Availability is an anti-join (NOT EXISTS)
+    so each room is checked with an index seek into room_night instead of a
+    scan of the booking table.
+    """
+    query = Room.query
+
+    if search_term:
+        query = text_search(query, search_term)
+
+    if start_date and end_date:
+        query = query.filter(~claimed_nights(start_date, end_date).exists())
+
+    if room_type:
+        query = query.filter(Room.type == room_type)
+
+    if amenity_ids:
+        mask = Amenity.mask_for(amenity_ids)
+        query = query.filter(Room.amenity_mask.op('&')(mask) == mask)
+
+    return query
+
+
+def text_search(query, search_term):
+    """
+    Restrict a Room query to rooms matching search_term, best matches first.
+    Databases without FTS5 fall back to a substring match on room number and
+    description.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        pattern = f'%{search_term}%'
+        return query.filter(or_(Room.room_number.ilike(pattern), Room.description.ilike(pattern)))
+
+    expression = match_expression(search_term)
+    if expression is None:
+        return query
+    return query.join(room_search, room_search.c.rowid == Room.id).filter(
+        room_search.c.room_search.op('MATCH')(expression)
+    ).order_by(room_search.c.rank)
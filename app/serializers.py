@@ -0,0 +1,74 @@
+# app/serializers.py
+
+from abc import ABC, abstractmethod
+
+from flask import url_for
+from app.loading import loading_profile
+
+
+class Serializer(ABC):
+    """
+    Turns model instances into JSON-ready dicts.
+
+    `profile` names the loading profile (see app/loading.py) covering every
+    relationship `dump` touches. Queries go through `apply` before being
+    serialized, so a page of results costs a fixed number of statements no
+    matter how many rows it has.
+    """
+    profile = None
+
+    @classmethod
+    def apply(cls, query):
+        return query.options(*loading_profile(cls.profile)) if cls.profile else query
+
+    @classmethod
+    @abstractmethod
+    def dump(cls, instance):
+        """
+        :return: The JSON-ready dict for one instance.
+        """
+
+    @classmethod
+    def dump_many(cls, instances):
+        return [cls.dump(instance) for instance in instances]
+
+
+class RoomSerializer(Serializer):
+    profile = 'room_detail'
+
+    @classmethod
+    def dump(cls, room):
+        return {
+            'id': room.id,
+            'room_number': room.room_number,
+            'type': room.type.value,
+            'price': room.price,
+            'description': room.description,
+            'amenities': sorted(amenity.name for amenity in room.amenities),
+            'photos': [{
+                'url': url_for('static', filename=photo.path),
+                'thumb': url_for('static', filename=photo.variant('thumb')),
+                'medium': url_for('static', filename=photo.variant('medium')),
+            } for photo in room.photos],
+        }
+
+
+class BookingSerializer(Serializer):
+    profile = 'booking_row'
+
+    @classmethod
+    def dump(cls, booking):
+        return {
+            'id': booking.id,
+            'room': {
+                'id': booking.room.id,
+                'room_number': booking.room.room_number,
+                'type': booking.room.type.value,
+            },
+            'start_date': booking.start_date.date().isoformat(),
+            'end_date': booking.end_date.date().isoformat(),
+            'nights': (booking.end_date - booking.start_date).days,
+            'total_price': booking.total_price,
+            'status': booking.status.value,
+            'expires_at': booking.expires_at.isoformat() + 'Z' if booking.expires_at else None,
+        }
@@ -0,0 +1,129 @@
+# app/user_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CachedUser:
+    """
+    Slim, detached snapshot of a User for Flask-Login's current_user.
+    Holds only what the request path reads on every page, never an ORM instance.
+    """
+
+    __slots__ = ('id', 'username', 'is_admin', 'is_active')
+
+    def __init__(self, id, username, is_admin, is_active):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+        self.is_active = is_active is None or bool(is_active)
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.is_admin, user.is_active)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['id'], data['username'], data['is_admin'], data['is_active'])
+
+    def to_dict(self):
+        return {'id': self.id, 'username': self.username, 'is_admin': self.is_admin, 'is_active': self.is_active}
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        return isinstance(other, CachedUser) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class UserCache:
+    """
+    Per-process LRU cache of CachedUser snapshots with a TTL.
+
+    An optional shared backend (anything with get(key), set(key, value, ttl)
+    and delete(key), e.g. a thin Redis wrapper) is consulted on a local miss,
+    so a fresh worker does not have to hit the database. Invalidation clears
+    both layers; other processes drop their local copy when its TTL runs out.
+
+    Config keys: USER_CACHE_SIZE, USER_CACHE_TTL and USER_CACHE_BACKEND.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, backend=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.maxsize = app.config.get('USER_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+        self.backend = app.config.get('USER_CACHE_BACKEND', self.backend)
+        self.clear()
+        app.extensions['user_cache'] = self
+
+    @staticmethod
+    def _key(user_id):
+        return f'user:{int(user_id)}'
+
+    def get(self, user_id, loader):
+        """
+        Return the snapshot for a user id, calling `loader(user_id)` on a miss.
+        :param loader: Callable returning a User or None.
+        :return: CachedUser, or None if the user does not exist.
+        """
+        user_id = int(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        snapshot = None
+        if self.backend is not None:
+            data = self.backend.get(self._key(user_id))
+            if data:
+                snapshot = CachedUser.from_dict(data)
+        if snapshot is None:
+            user = loader(user_id)
+            if user is None:
+                return None
+            snapshot = CachedUser.from_user(user)
+            if self.backend is not None:
+                self.backend.set(self._key(user_id), snapshot.to_dict(), self.ttl)
+
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(int(user_id), None)
+        if self.backend is not None:
+            for user_id in user_ids:
+                self.backend.delete(self._key(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,192 @@
+# app/warmup.py
+
+import os
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy.orm import configure_mappers
+from sqlalchemy.pool import QueuePool
+
+
+class StartupReport:
+    """
+    How long each step of building and warming up a worker took, from the
+    start of create_app until the worker is ready for traffic.
+    """
+
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.steps = {}
+        self.counts = {}
+        self.total = None
+
+    def mark(self, name):
+        """
+        Record the time since the previous mark or step as step `name`.
+        """
+        now = time.perf_counter()
+        self.steps[name] = now - self._last
+        self._last = now
+
+    @contextmanager
+    def step(self, name):
+        self._last = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 1) if self.total is not None else None,
+            'steps_ms': {name: round(elapsed * 1000, 1) for name, elapsed in self.steps.items()},
+            'counts': dict(self.counts),
+        }
+
+    def summary(self):
+        steps = ', '.join(
+            f'{name} {elapsed * 1000:.0f} ms' + (f' ({self.counts[name]})' if name in self.counts else '')
+            for name, elapsed in self.steps.items()
+        )
+        return f'Worker ready in {self.total * 1000:.0f} ms: {steps}'
+
+
+def bytecode_cache(app):
+    """
+    On-disk cache of compiled templates shared by all workers on the host,
+    so a new worker loads bytecode instead of compiling Jinja source. Entries
+    are keyed on the template source, so edited templates are recompiled.
+    :return: The cache, or None if JINJA_BYTECODE_CACHE is off.
+    """
+    if not app.config.get('JINJA_BYTECODE_CACHE', True):
+        return None
+    directory = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if directory:
+        # Jinja does not create a configured directory; on a fresh deploy it
+        # may not exist yet
+        os.makedirs(directory, exist_ok=True)
+    # None lets Jinja pick a private directory under the system temp dir
+    return FileSystemBytecodeCache(directory)
+
+
+def compile_templates(app):
+    """
+    Load every template under the template folder into the Jinja cache.
+    :return: Number of templates compiled.
+    """
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def _engines(app):
+    from app.extensions import db
+
+    engines = [db.get_engine(app)] + [db.get_engine(app, bind=key) for key in app.config.get('SQLALCHEMY_BINDS') or {}]
+    return list({id(engine): engine for engine in engines}.values())
+
+
+def open_pools(app):
+    """
+    Open the connection pool of the primary database and of every bind up to
+    its size, so a database that cannot be reached shows up at startup.
+    :return: Number of connections opened.
+    """
+    opened = 0
+    for engine in _engines(app):
+        size = engine.pool.size() if isinstance(engine.pool, QueuePool) else 1
+        connections = []
+        try:
+            for _ in range(size):
+                connections.append(engine.connect())
+        finally:
+            for connection in connections:
+                connection.close()
+        opened += len(connections)
+    return opened
+
+
+def release_pools(app):
+    """
+    Close every pooled connection. Workers forked after create_app (e.g.
+    gunicorn --preload) would otherwise share the parent's connections and
+    file handles; each process opens its own on first use.
+    """
+    for engine in _engines(app):
+        engine.dispose()
+
+
+def prime_queries():
+    """
+    Run the hot read paths once, on at most one row each, so SQLAlchemy
+    compiles their statements and sets up their loaders before real traffic
+    does: the user loader, the room search, every loading profile. Also
+    loads the rate calendar.
+    """
+    from app.extensions import db, rate_calendar
+    from app.loading import LOADING_PROFILES, with_profile
+    from app.models import Room, Booking, User
+    from app.search import room_search_query
+
+    User.query.get(0)
+    tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+    with_profile(room_search_query(tomorrow, tomorrow + timedelta(days=1)), 'room_card').limit(1).all()
+    for name in LOADING_PROFILES:
+        model = {'room': Room, 'booking': Booking, 'user': User}[name.split('_')[0]]
+        with_profile(model.query, name).limit(1).all()
+    rate_calendar.warm_up()
+    db.session.remove()
+
+
+def warm_up(app, report):
+    """
+    Do the work the first requests of a fresh worker would otherwise pay
+    for: configure the SQLAlchemy mappers, compile all templates, build the
+    URL matcher, check the database pools and prime the hot queries. Pooled
+    connections are released at the end, see release_pools. Run by
+    create_app unless WARM_UP is off. Failures are logged, not raised (a
+    database that cannot be reached or has not been migrated yet, a cache
+    directory that cannot be written), so the worker still starts and does
+    the work lazily instead.
+    """
+    with report.step('mappers'):
+        configure_mappers()
+    with report.step('templates'):
+        try:
+            report.counts['templates'] = compile_templates(app)
+        except Exception:
+            app.logger.exception('Could not compile the templates during warm-up')
+    with report.step('url_map'):
+        app.url_map.update()
+    with report.step('database_pool'):
+        try:
+            report.counts['database_pool'] = open_pools(app)
+        except Exception:
+            app.logger.exception('Could not open the database pool during warm-up')
+    with report.step('queries'), app.app_context():
+        try:
+            prime_queries()
+        except Exception as e:
+            app.logger.warning('Queries not primed during warm-up: %s', e)
+    release_pools(app)
+
+
+@click.command('warm-up')
+@with_appcontext
+def warm_up_command():
+    """Warm up a worker, filling the template bytecode cache, and report startup timings."""
+    from flask import current_app
+
+    startup = current_app.extensions['startup']
+    if 'templates' not in startup.steps:  # WARM_UP is off
+        warm_up(current_app, startup)
+        startup.finish()
+    click.echo(startup.summary())
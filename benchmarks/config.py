@@ -0,0 +1,12 @@
+# benchmarks/config.py
+
+import os
+
+
+class BenchConfig:
+    # Database file created by benchmarks/run.py; override with BENCH_DATABASE_URL
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL', 'sqlite:///' + os.path.abspath('bench.db'))
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    TESTING = True
+    # Keep login benchmarks short; production uses the default work factor
+    BCRYPT_LOG_ROUNDS = 4
@@ -0,0 +1,139 @@
+# benchmarks/datagen.py
+
+"""
+Seeded synthetic data generator for the benchmark suite.
+
+Fills users, rooms, amenities, photos and bookings at a configurable scale
+(up to millions of bookings) with plain batched inserts. Bookings are laid out
+room by room so they never overlap, which lets the generator write the
+matching room_night rows directly; the daily rollups are rebuilt at the end.
+The same seed always produces the same database.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from app.extensions import db, password_hasher
+from app.models import User, Room, RoomType, Amenity, Photo, Booking, BookingStatus, RoomNight, room_amenities
+from app.rollups import backfill
+
+# Rows per executemany batch
+BATCH_SIZE = 10000
+
+# Password shared by every generated user
+PASSWORD = 'benchmark-password'
+
+# Admin account used by the admin benchmarks
+ADMIN_EMAIL = 'admin@example.com'
+
+AMENITY_NAMES = ['WiFi', 'TV', 'Mini Bar', 'Air Conditioning', 'Safe', 'Balcony', 'Sea View',
+                 'Bathtub', 'Coffee Machine', 'Desk', 'Kitchenette', 'Workspace', 'Hair Dryer',
+                 'Iron', 'Crib', 'Sofa Bed']
+
+WORDS = ['quiet', 'bright', 'spacious', 'cosy', 'modern', 'classic', 'garden', 'city', 'corner',
+         'top floor', 'renovated', 'family', 'business', 'view', 'king bed', 'twin beds']
+
+# Named scales: users, rooms, bookings
+SCALES = {
+    'tiny': (200, 50, 2000),
+    'small': (2000, 200, 20000),
+    'medium': (20000, 1000, 250000),
+    'large': (200000, 3000, 2000000),
+}
+
+STATUS_WEIGHTS = [(BookingStatus.CONFIRMED, 70), (BookingStatus.PENDING, 20), (BookingStatus.CANCELLED, 10)]
+
+
+def _insert(table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def generate(users=2000, rooms=200, bookings=20000, photos_per_room=2, seed=42, today=None):
+    """
+    Populate an empty database. Call inside an application context.
+    :return: Dict with the number of rows written per table and the booking horizon.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    password_hash = password_hasher.hash(PASSWORD)
+
+    _insert(Amenity.__table__, [{'id': index + 1, 'name': name} for index, name in enumerate(AMENITY_NAMES)])
+
+    user_rows = [{
+        'id': 1, 'username': 'admin', 'email': ADMIN_EMAIL, 'first_name': 'Ada', 'last_name': 'Admin',
+        'date_registered': today - timedelta(days=3650), 'password_hash': password_hash,
+        'is_admin': True, 'is_active': True,
+    }]
+    for user_id in range(2, users + 1):
+        user_rows.append({
+            'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+            'first_name': f'First{user_id}', 'last_name': f'Last{user_id}',
+            'date_registered': today - timedelta(minutes=rng.randrange(5 * 365 * 24 * 60)),
+            'password_hash': password_hash, 'is_admin': False, 'is_active': True,
+        })
+    _insert(User.__table__, user_rows)
+
+    room_rows, amenity_rows, photo_rows = [], [], []
+    for room_id in range(1, rooms + 1):
+        room_type = RoomType.SINGLE if rng.random() < 0.5 else RoomType.DOUBLE
+        amenity_ids = rng.sample(range(1, len(AMENITY_NAMES) + 1), rng.randint(2, 8))
+        room_rows.append({
+            'id': room_id, 'room_number': f'{room_id // 100 + 1}{room_id % 100:02d}',
+            'type': room_type, 'price': float(rng.randrange(60, 400)),
+            'description': ' '.join(rng.sample(WORDS, 4)),
+            'amenity_mask': Amenity.mask_for(amenity_ids),
+        })
+        for amenity_id in amenity_ids:
+            amenity_rows.append({'room_id': room_id, 'amenity_id': amenity_id})
+        for index in range(photos_per_room):
+            photo_rows.append({'room_id': room_id, 'path': f'room_photos/synthetic_{room_id}_{index}.jpg'})
+    _insert(Room.__table__, room_rows)
+    _insert(room_amenities, amenity_rows)
+    _insert(Photo.__table__, photo_rows)
+
+    # Spread the bookings evenly over the rooms, walking each room forward in
+    # time from well in the past so stays never overlap.
+    prices = {row['id']: row['price'] for row in room_rows}
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    weights = [weight for _, weight in STATUS_WEIGHTS]
+    per_room = bookings // rooms if rooms else 0
+    extra = bookings - per_room * rooms
+    history_days = max(per_room * 5, 30)
+    booking_rows, night_rows = [], []
+    booking_id = 0
+    horizon = today
+    for room_id in range(1, rooms + 1):
+        day = today - timedelta(days=history_days)
+        for _ in range(per_room + (1 if room_id <= extra else 0)):
+            booking_id += 1
+            day += timedelta(days=rng.randint(0, 3))
+            nights = rng.randint(1, 7)
+            start_date, end_date = day, day + timedelta(days=nights)
+            status = rng.choices(statuses, weights)[0]
+            booking_rows.append({
+                'id': booking_id, 'user_id': rng.randint(2, users) if users > 1 else 1, 'room_id': room_id,
+                'start_date': start_date, 'end_date': end_date,
+                'total_price': nights * prices[room_id], 'status': status,
+            })
+            if status != BookingStatus.CANCELLED:
+                night_rows.extend(
+                    {'room_id': room_id, 'night': night, 'booking_id': booking_id}
+                    for night in RoomNight.nights(start_date, end_date)
+                )
+            day = end_date
+            horizon = max(horizon, end_date)
+            if len(booking_rows) >= BATCH_SIZE:
+                _insert(Booking.__table__, booking_rows)
+                _insert(RoomNight.__table__, night_rows)
+                booking_rows, night_rows = [], []
+    _insert(Booking.__table__, booking_rows)
+    _insert(RoomNight.__table__, night_rows)
+    db.session.commit()
+
+    backfill()
+    return {
+        'users': users, 'rooms': rooms, 'bookings': booking_id,
+        'amenities': len(AMENITY_NAMES), 'photos': len(photo_rows),
+        'horizon': horizon.date().isoformat(),
+    }
@@ -0,0 +1,239 @@
+# benchmarks/run.py
+
+"""
+Reproducible performance benchmarks for the main request paths.
+
+Builds a fresh SQLite database with the seeded generator in benchmarks/datagen.py,
+then drives search_rooms, book_room, auth.login, list_rooms_for_admin and
+manage_users through the Flask test client. For each one it reports the
+latency of the first request (as a freshly warmed-up worker serves it),
+latency percentiles and the number of SQL statements per request, and
+compares them with a stored baseline: more queries than the baseline, or a
+p95 latency above baseline * tolerance, fails the run with exit code 1.
+
+Usage:
+    python -m benchmarks.run [--scale small] [--iterations 50] [--seed 42] [--cold]
+                             [--baseline benchmarks/baseline.json] [--update-baseline]
+                             [--output results.json]
+
+Latency baselines depend on the machine; refresh them with --update-baseline
+on the hardware that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Absolute latency slack (seconds) on top of the relative tolerance, so very
+# fast endpoints do not fail on timer noise
+LATENCY_SLACK = 0.005
+
+
+class QueryCounter:
+    """Counts SQL statements sent through an engine."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._increment)
+
+    def _increment(self, *args):
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+
+def percentile(values, quantile):
+    ordered = sorted(values)
+    return ordered[min(int(round(quantile * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+def measure(make_request, counter, iterations, warmup):
+    latencies, queries, statuses = [], [], {}
+    for iteration in range(warmup + iterations):
+        counter.reset()
+        started = time.perf_counter()
+        response = make_request(iteration)
+        elapsed = time.perf_counter() - started
+        if iteration == 0:
+            first = elapsed
+        if iteration < warmup:
+            continue
+        latencies.append(elapsed)
+        queries.append(counter.count)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+    return {
+        'iterations': iterations,
+        'first': first,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'mean': statistics.mean(latencies),
+        'queries_p50': statistics.median(queries),
+        'queries_max': max(queries),
+        'statuses': statuses,
+    }
+
+
+def logged_in_client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+
+def run_benchmarks(app, summary, iterations, warmup, seed):
+    from app.extensions import db
+    from benchmarks.datagen import PASSWORD
+
+    rng = random.Random(seed)
+    today = date.today()
+    horizon = date.fromisoformat(summary['horizon'])
+    admin = logged_in_client(app, 1)
+    customer = logged_in_client(app, 2)
+
+    def search_rooms(iteration):
+        start_day = today + timedelta(days=rng.randrange(60))
+        return customer.post('/search_rooms', data={
+            'roomType': rng.choice(['SINGLE', 'DOUBLE']),
+            'start_date': start_day.isoformat(),
+            'end_date': (start_day + timedelta(days=rng.randint(1, 7))).isoformat(),
+        })
+
+    def book_room(iteration):
+        # Every iteration books a fresh stretch past the generated history
+        start_day = horizon + timedelta(days=10 * (iteration + 1))
+        return customer.post(f'/book-room/{rng.randint(1, summary["rooms"])}', data={
+            'start_date': start_day.isoformat(),
+            'end_date': (start_day + timedelta(days=3)).isoformat(),
+        })
+
+    def login(iteration):
+        user_id = rng.randint(2, summary['users'])
+        return app.test_client().post('/auth/login', data={
+            'email': f'user{user_id}@example.com', 'password': PASSWORD,
+        })
+
+    def list_rooms_for_admin(iteration):
+        return admin.get('/admin/list-rooms')
+
+    def manage_users(iteration):
+        return admin.get('/admin/manage-users')
+
+    benchmarks = {
+        'search_rooms': search_rooms,
+        'book_room': book_room,
+        'auth.login': login,
+        'list_rooms_for_admin': list_rooms_for_admin,
+        'manage_users': manage_users,
+    }
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+    results = {}
+    for name, make_request in benchmarks.items():
+        results[name] = measure(make_request, counter, iterations, warmup)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    :return: List of regression messages, empty when everything is within bounds.
+    """
+    failures = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if result['queries_p50'] > expected['queries_p50']:
+            failures.append(f"{name}: {result['queries_p50']} queries per request, baseline {expected['queries_p50']}")
+        limit = expected['p95'] * tolerance + LATENCY_SLACK
+        if result['p95'] > limit:
+            failures.append(f"{name}: p95 {result['p95'] * 1000:.1f} ms, limit {limit * 1000:.1f} ms")
+    return failures
+
+
+def print_report(results):
+    print(f"{'benchmark':<22}{'first ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}  statuses")
+    for name, result in results.items():
+        print(f"{name:<22}{result['first'] * 1000:>10.1f}{result['p50'] * 1000:>10.1f}{result['p95'] * 1000:>10.1f}"
+              f"{result['p99'] * 1000:>10.1f}{result['queries_p50']:>10g}  {result['statuses']}")
+
+
+def main(argv=None):
+    from benchmarks.datagen import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cold', action='store_true', help='disable the room catalog cache')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed p95 ratio over the baseline')
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='hotel-bench-')
+    os.environ.setdefault('BENCH_DATABASE_URL', 'sqlite:///' + os.path.join(workdir, 'bench.db'))
+
+    from app.routes import create_app
+    from app.extensions import db
+    from benchmarks.config import BenchConfig
+    from benchmarks.datagen import generate
+
+    app = create_app(BenchConfig)
+    print(app.extensions['startup'].summary())
+    if args.cold:
+        app.config['CATALOG_CACHE_SIZE'] = 0
+        app.extensions['catalog_cache'].init_app(app)
+
+    users, rooms, bookings = SCALES[args.scale]
+    started = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        summary = generate(users=users, rooms=rooms, bookings=bookings, seed=args.seed)
+    print(f"Generated {summary['bookings']} bookings, {summary['rooms']} rooms and "
+          f"{summary['users']} users in {time.perf_counter() - started:.1f}s")
+
+    results = run_benchmarks(app, summary, args.iterations, args.warmup, args.seed)
+    print_report(results)
+
+    report = {'scale': args.scale, 'cold': args.cold, 'benchmarks': results}
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as source:
+            baseline = json.load(source)
+    if baseline.get('scale') != args.scale or baseline.get('cold', False) != args.cold:
+        print('No baseline for this scale and cache mode; skipping comparison.')
+        return 0
+
+    failures = compare(results, baseline.get('benchmarks', {}), args.tolerance)
+    for failure in failures:
+        print(f'REGRESSION {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
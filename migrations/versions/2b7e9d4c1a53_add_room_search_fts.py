@@ -0,0 +1,62 @@
+"""Add room full-text search index
+
+Revision ID: 2b7e9d4c1a53
+Revises: 9f3c6b1d4e82
+Create Date: 2026-10-18 20:02:41.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b7e9d4c1a53'
+down_revision = '9f3c6b1d4e82'
+branch_labels = None
+depends_on = None
+
+AMENITIES = (
+    "(SELECT coalesce(group_concat(amenity.name, ' '), '') FROM room_amenities "
+    "JOIN amenity ON amenity.id = room_amenities.amenity_id WHERE room_amenities.room_id = {room_id})"
+)
+
+TRIGGERS = ['room_search_ai', 'room_search_au', 'room_search_ad',
+            'room_search_amenity_ai', 'room_search_amenity_ad', 'room_search_amenity_au']
+
+
+def upgrade():
+    # SQLite only: FTS5 has no equivalent elsewhere, and app/search.py falls
+    # back to substring matching on other databases.
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("CREATE VIRTUAL TABLE room_search USING fts5("
+               "room_number, description, amenities, tokenize = 'unicode61', prefix = '2 3')")
+    op.execute("CREATE TRIGGER room_search_ai AFTER INSERT ON room BEGIN "
+               "INSERT INTO room_search (rowid, room_number, description, amenities) "
+               "VALUES (new.id, new.room_number, coalesce(new.description, ''), "
+               + AMENITIES.format(room_id='new.id') + "); END")
+    op.execute("CREATE TRIGGER room_search_au AFTER UPDATE OF room_number, description ON room BEGIN "
+               "UPDATE room_search SET room_number = new.room_number, description = coalesce(new.description, '') "
+               "WHERE rowid = new.id; END")
+    op.execute("CREATE TRIGGER room_search_ad AFTER DELETE ON room BEGIN "
+               "DELETE FROM room_search WHERE rowid = old.id; END")
+    op.execute("CREATE TRIGGER room_search_amenity_ai AFTER INSERT ON room_amenities BEGIN "
+               "UPDATE room_search SET amenities = " + AMENITIES.format(room_id='new.room_id')
+               + " WHERE rowid = new.room_id; END")
+    op.execute("CREATE TRIGGER room_search_amenity_ad AFTER DELETE ON room_amenities BEGIN "
+               "UPDATE room_search SET amenities = " + AMENITIES.format(room_id='old.room_id')
+               + " WHERE rowid = old.room_id; END")
+    op.execute("CREATE TRIGGER room_search_amenity_au AFTER UPDATE OF name ON amenity BEGIN "
+               "UPDATE room_search SET amenities = " + AMENITIES.format(room_id='room_search.rowid')
+               + " WHERE rowid IN (SELECT room_id FROM room_amenities WHERE amenity_id = new.id); END")
+    op.execute("INSERT INTO room_search (rowid, room_number, description, amenities) "
+               "SELECT room.id, room.room_number, coalesce(room.description, ''), "
+               + AMENITIES.format(room_id='room.id') + " FROM room")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS room_search')
@@ -0,0 +1,28 @@
+"""Add booking indexes
+
+Revision ID: 3d9f0b5c2a41
+Revises: 7ac6110599bd
+Create Date: 2026-10-18 09:12:40.118503
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d9f0b5c2a41'
+down_revision = '7ac6110599bd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_booking_room_dates', 'booking', ['room_id', 'start_date', 'end_date', 'status'], unique=False)
+    op.create_index('ix_booking_dates', 'booking', ['start_date', 'end_date'], unique=False)
+    op.create_index('ix_booking_user_id', 'booking', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_booking_user_id', table_name='booking')
+    op.drop_index('ix_booking_dates', table_name='booking')
+    op.drop_index('ix_booking_room_dates', table_name='booking')
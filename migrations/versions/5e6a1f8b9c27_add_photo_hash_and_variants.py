@@ -0,0 +1,30 @@
+"""Add photo content hash and variants
+
+Revision ID: 5e6a1f8b9c27
+Revises: c4a7d2e9f611
+Create Date: 2026-10-18 13:26:51.204377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e6a1f8b9c27'
+down_revision = 'c4a7d2e9f611'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('photo', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('variants', sa.Text(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_photo_content_hash'), ['content_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('photo', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_photo_content_hash'))
+        batch_op.drop_column('variants')
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,35 @@
+"""Add room amenity mask
+
+Revision ID: 6d1c8e2f7b94
+Revises: 2b7e9d4c1a53
+Create Date: 2026-10-18 20:31:07.402518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d1c8e2f7b94'
+down_revision = '2b7e9d4c1a53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('room', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('amenity_mask', sa.Integer(), server_default='0', nullable=False))
+
+    # Each amenity sets bit (id - 1); a room lists an amenity at most once,
+    # so summing the bits is the same as OR-ing them.
+    op.execute('UPDATE room SET amenity_mask = (SELECT coalesce(sum(1 << (amenity_id - 1)), 0) '
+               'FROM room_amenities WHERE room_amenities.room_id = room.id)')
+
+
+def downgrade():
+    # A batch rebuild of room would drop the room_search triggers; SQLite
+    # 3.35+ can drop the column in place.
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ALTER TABLE room DROP COLUMN amenity_mask')
+    else:
+        op.drop_column('room', 'amenity_mask')
@@ -0,0 +1,69 @@
+"""Add room_night inventory
+
+Revision ID: 8b21e4f7c3d0
+Revises: 3d9f0b5c2a41
+Create Date: 2026-10-18 10:41:05.772190
+
+"""
+from datetime import datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b21e4f7c3d0'
+down_revision = '3d9f0b5c2a41'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.date()
+
+
+def upgrade():
+    room_night = op.create_table('room_night',
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('night', sa.Date(), nullable=False),
+    sa.Column('booking_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['booking_id'], ['booking.id'], ),
+    sa.ForeignKeyConstraint(['room_id'], ['room.id'], ),
+    sa.PrimaryKeyConstraint('room_id', 'night')
+    )
+    op.create_index('ix_room_night_night', 'room_night', ['night'], unique=False)
+    op.create_index('ix_room_night_booking_id', 'room_night', ['booking_id'], unique=False)
+
+    # Backfill from live bookings. Older data may already overlap, in which
+    # case the earliest booking keeps the night.
+    bookings = op.get_bind().execute(sa.text(
+        "SELECT id, room_id, start_date, end_date FROM booking "
+        "WHERE status IS NULL OR status != 'CANCELLED' ORDER BY id"
+    ))
+    claimed = set()
+    rows = []
+    for booking_id, room_id, start_date, end_date in bookings:
+        if start_date is None or end_date is None:
+            continue
+        first, last = _as_date(start_date), _as_date(end_date)
+        for offset in range((last - first).days):
+            night = first + timedelta(days=offset)
+            if (room_id, night) in claimed:
+                continue
+            claimed.add((room_id, night))
+            rows.append({'room_id': room_id, 'night': night, 'booking_id': booking_id})
+            if len(rows) >= BATCH_SIZE:
+                op.bulk_insert(room_night, rows)
+                rows = []
+    if rows:
+        op.bulk_insert(room_night, rows)
+
+
+def downgrade():
+    op.drop_index('ix_room_night_booking_id', table_name='room_night')
+    op.drop_index('ix_room_night_night', table_name='room_night')
+    op.drop_table('room_night')
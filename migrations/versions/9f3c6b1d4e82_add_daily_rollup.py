@@ -0,0 +1,33 @@
+"""Add daily rollup
+
+Revision ID: 9f3c6b1d4e82
+Revises: 5e6a1f8b9c27
+Create Date: 2026-10-18 14:48:12.663905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f3c6b1d4e82'
+down_revision = '5e6a1f8b9c27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fill with `flask backfill-rollups` after upgrading.
+    op.create_table('daily_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('room_type', sa.Enum('SINGLE', 'DOUBLE', name='roomtype'), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'CONFIRMED', 'CANCELLED', name='bookingstatus'), nullable=False),
+    sa.Column('room_nights', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('bookings', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'room_type', 'status')
+    )
+
+
+def downgrade():
+    op.drop_table('daily_rollup')
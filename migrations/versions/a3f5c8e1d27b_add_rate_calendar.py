@@ -0,0 +1,51 @@
+"""Add rate calendar
+
+Revision ID: a3f5c8e1d27b
+Revises: 6d1c8e2f7b94
+Create Date: 2026-10-18 22:14:36.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f5c8e1d27b'
+down_revision = '6d1c8e2f7b94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rate_rule',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=80), nullable=False),
+    sa.Column('room_id', sa.Integer(), nullable=True),
+    sa.Column('room_type', sa.Enum('SINGLE', 'DOUBLE', name='roomtype'), nullable=True),
+    sa.Column('start_day', sa.Date(), nullable=True),
+    sa.Column('end_day', sa.Date(), nullable=True),
+    sa.Column('weekdays', sa.Integer(), server_default='127', nullable=False),
+    sa.Column('price', sa.Float(), nullable=True),
+    sa.Column('factor', sa.Float(), server_default='1.0', nullable=False),
+    sa.Column('priority', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['room_id'], ['room.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('rate_rule', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_rate_rule_room_id'), ['room_id'], unique=False)
+
+    op.create_table('stay_discount',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('room_type', sa.Enum('SINGLE', 'DOUBLE', name='roomtype'), nullable=True),
+    sa.Column('min_nights', sa.Integer(), nullable=False),
+    sa.Column('percent', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('stay_discount')
+    with op.batch_alter_table('rate_rule', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_rate_rule_room_id'))
+
+    op.drop_table('rate_rule')
@@ -0,0 +1,32 @@
+"""Add listing sort indexes
+
+Revision ID: c4a7d2e9f611
+Revises: 8b21e4f7c3d0
+Create Date: 2026-10-18 12:03:27.530144
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a7d2e9f611'
+down_revision = '8b21e4f7c3d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_user_date_registered'), 'user', ['date_registered'], unique=False)
+    op.create_index(op.f('ix_room_room_number'), 'room', ['room_number'], unique=False)
+    op.create_index(op.f('ix_room_price'), 'room', ['price'], unique=False)
+    op.drop_index('ix_booking_user_id', table_name='booking')
+    op.create_index('ix_booking_user_start', 'booking', ['user_id', 'start_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_booking_user_start', table_name='booking')
+    op.create_index('ix_booking_user_id', 'booking', ['user_id'], unique=False)
+    op.drop_index(op.f('ix_room_price'), table_name='room')
+    op.drop_index(op.f('ix_room_room_number'), table_name='room')
+    op.drop_index(op.f('ix_user_date_registered'), table_name='user')
@@ -0,0 +1,36 @@
+"""Add booking holds and live booking index
+
+Revision ID: e8b4d1f6a392
+Revises: a3f5c8e1d27b
+Create Date: 2026-10-18 23:02:51.730164
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b4d1f6a392'
+down_revision = 'a3f5c8e1d27b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing PENDING bookings keep a null expires_at and never lapse.
+    # A plain ALTER keeps the room_search triggers a batch rebuild would drop.
+    op.add_column('booking', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.drop_index('ix_booking_room_dates', table_name='booking')
+    op.create_index('ix_booking_live_room_dates', 'booking', ['room_id', 'start_date', 'end_date'], unique=False,
+                    sqlite_where=sa.text("status != 'CANCELLED'"), postgresql_where=sa.text("status != 'CANCELLED'"))
+    op.create_index('ix_booking_room_id', 'booking', ['room_id'], unique=False)
+    op.create_index('ix_booking_hold_expiry', 'booking', ['expires_at'], unique=False,
+                    sqlite_where=sa.text("status = 'PENDING'"), postgresql_where=sa.text("status = 'PENDING'"))
+
+
+def downgrade():
+    op.drop_index('ix_booking_hold_expiry', table_name='booking')
+    op.drop_index('ix_booking_room_id', table_name='booking')
+    op.drop_index('ix_booking_live_room_dates', table_name='booking')
+    op.create_index('ix_booking_room_dates', 'booking', ['room_id', 'start_date', 'end_date', 'status'], unique=False)
+    op.drop_column('booking', 'expires_at')
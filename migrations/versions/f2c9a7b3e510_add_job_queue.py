@@ -0,0 +1,43 @@
+"""Add job queue
+
+Revision ID: f2c9a7b3e510
+Revises: e8b4d1f6a392
+Create Date: 2026-10-18 23:48:09.215637
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c9a7b3e510'
+down_revision = 'e8b4d1f6a392'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=80), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'DONE', 'DEAD', name='jobstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_job_queued_run_at', 'job', ['run_at'], unique=False,
+                    sqlite_where=sa.text("status = 'QUEUED'"), postgresql_where=sa.text("status = 'QUEUED'"))
+    op.create_index('ix_job_running_locked_at', 'job', ['locked_at'], unique=False,
+                    sqlite_where=sa.text("status = 'RUNNING'"), postgresql_where=sa.text("status = 'RUNNING'"))
+
+
+def downgrade():
+    op.drop_index('ix_job_running_locked_at', table_name='job')
+    op.drop_index('ix_job_queued_run_at', table_name='job')
+    op.drop_table('job')
@@ -1,8 +1,17 @@
 # File: run.py
+import os
+
 from app.routes import create_app
+from app.extensions import job_runner, hold_sweeper
 
 app = create_app()
 
 # Check if the script is the main entry point
 if __name__ == "__main__":
+    # Run background jobs and the hold sweeper in this process as well; with
+    # the reloader only the child process that serves requests starts them.
+    # Production workers run `flask run-jobs` instead.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        job_runner.start()
+        hold_sweeper.start()
     app.run(debug=True)  # Run the Flask application with debugging enabled